@@ -0,0 +1,160 @@
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Redis and Prometheus are optional at runtime: without them the cache
+# degrades to the in-process tier and counters stay local
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+try:
+    from prometheus_client import Counter
+except ImportError:
+    Counter = None
+
+logger = logging.getLogger(__name__)
+
+if Counter is not None:
+    _CACHE_HITS = Counter("cache_hit", "Cache hits", ["cache", "tier"])
+    _CACHE_MISSES = Counter("cache_miss", "Cache misses", ["cache"])
+else:
+    _CACHE_HITS = _CACHE_MISSES = None
+
+
+def _digest(text: str) -> str:
+    """Short stable digest of text for cache keys"""
+    return hashlib.md5(text.encode(), usedforsecurity=False).hexdigest()
+
+
+class TwoTierCache:
+    """In-process LRU in front of Redis; entries expire after ttl seconds in both tiers"""
+    
+    def __init__(self, name: str, redis_url: Optional[str] = None, ttl: int = 3600, max_size: int = 1024):
+        self.name = name
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.local_cache = OrderedDict()
+        self._cache_max = max_size
+        self._redis = None
+        self._hits = {"local": 0, "redis": 0}
+        self._misses = 0
+    
+    async def connect(self):
+        """Connect to Redis; stay in-process only if it is unavailable"""
+        if not self.redis_url or aioredis is None:
+            logger.info(f"{self.name} cache running without Redis")
+            return
+        
+        try:
+            client = aioredis.from_url(self.redis_url, decode_responses=True)
+            await client.ping()
+            self._redis = client
+            logger.info(f"✅ {self.name} cache connected to Redis")
+        except Exception as e:
+            logger.warning(f"Redis unavailable, using in-process {self.name} cache only: {e}")
+    
+    async def close(self):
+        """Drop cached entries and close the Redis connection"""
+        self.local_cache.clear()
+        if self._redis is not None:
+            try:
+                await self._redis.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing Redis connection: {e}")
+            self._redis = None
+    
+    def _remember(self, key: str, value: str):
+        """Store in the in-process tier, evicting the least recently used entry"""
+        if key in self.local_cache:
+            self.local_cache.move_to_end(key)
+        elif len(self.local_cache) >= self._cache_max:
+            self.local_cache.popitem(last=False)
+        self.local_cache[key] = (time.monotonic() + self.ttl, value)
+    
+    def _count_hit(self, tier: str):
+        """Record a hit on the given tier"""
+        self._hits[tier] += 1
+        if _CACHE_HITS is not None:
+            _CACHE_HITS.labels(cache=self.name, tier=tier).inc()
+    
+    async def _get(self, key: str) -> Optional[str]:
+        """Look up a key in memory, then in Redis"""
+        entry = self.local_cache.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self.local_cache.move_to_end(key)
+                self._count_hit("local")
+                return value
+            del self.local_cache[key]
+        
+        if self._redis is not None:
+            try:
+                value = await self._redis.get(key)
+            except Exception as e:
+                logger.warning(f"Redis GET failed: {e}")
+                value = None
+            if value is not None:
+                self._remember(key, value)
+                self._count_hit("redis")
+                return value
+        
+        self._misses += 1
+        if _CACHE_MISSES is not None:
+            _CACHE_MISSES.labels(cache=self.name).inc()
+        return None
+    
+    async def _set(self, key: str, value: str):
+        """Store a value in both tiers"""
+        self._remember(key, value)
+        
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, value, ex=self.ttl)
+            except Exception as e:
+                logger.warning(f"Redis SET failed: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            "local_size": len(self.local_cache),
+            "local_max_size": self._cache_max,
+            "redis_connected": self._redis is not None,
+            "local_hits": self._hits["local"],
+            "redis_hits": self._hits["redis"],
+            "misses": self._misses
+        }
+
+
+class TranslationCache(TwoTierCache):
+    """Two-tier cache of translations keyed by text and language pair"""
+    
+    def __init__(self, redis_url: Optional[str] = None, ttl: int = 86400 * 14, max_size: int = 1024):
+        super().__init__("translation", redis_url, ttl, max_size)
+    
+    async def get(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """Look up a translation"""
+        return await self._get(f"translate:v1:{_digest(text)}:{source_lang}:{target_lang}")
+    
+    async def set(self, text: str, source_lang: str, target_lang: str, translated: str):
+        """Store a translation"""
+        await self._set(f"translate:v1:{_digest(text)}:{source_lang}:{target_lang}", translated)
+
+
+class CommandResponseCache(TwoTierCache):
+    """Two-tier cache of serialized command responses keyed by language and text"""
+    
+    def __init__(self, redis_url: Optional[str] = None, ttl: int = 300, max_size: int = 1024):
+        super().__init__("command_response", redis_url, ttl, max_size)
+    
+    async def get(self, lang: str, text: str) -> Optional[str]:
+        """Look up a serialized response"""
+        return await self._get(f"nlp:v1:{lang}:{_digest(text)}")
+    
+    async def set(self, lang: str, text: str, response_json: str):
+        """Store a serialized response"""
+        await self._set(f"nlp:v1:{lang}:{_digest(text)}", response_json)
@@ -1,35 +1,201 @@
+import os
 import re
-import json
+import sys
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Set, Tuple
 from datetime import datetime, timedelta
 import asyncio
+import httpx
 
 # For production, you'd use these imports:
 # from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
 # import openai
 # import spacy
+# import hyperscan
+# import re2
 
 logger = logging.getLogger(__name__)
 
+# Precompiled entity regexes (input is lowercased in process_command,
+# except _NAME_RE which runs on the original casing)
+_HAS_DIGIT_RE = re.compile(r'\d')
+_HAS_UPPER_RE = re.compile(r'[A-Z]')
+_REL_DATE_RE = re.compile(r'\b(today|tomorrow|yesterday|this week|next week|last week)\b')
+_REL_DATE_OFFSETS = {
+    'today': 0,
+    'tomorrow': 1,
+    'yesterday': -1,
+    'this week': 0,
+    'next week': 7,
+    'last week': -7,
+}
+# YYYY-MM-DD, MM-DD-YYYY or MM-DD-YY (with - or / separators)
+_DATE_RE = re.compile(r'\b(\d{4}[-/]\d{1,2}[-/]\d{1,2}|\d{1,2}[-/]\d{1,2}[-/](?:\d{4}|\d{2}))\b')
+_EMP_ID_RE = re.compile(r'\b(?:employee|emp)\s*(?:id|#)?\s*(\d+)\b')
+# First + last name after a cue word, so capitalised commands ("Show My
+# Attendance") aren't read as names
+_NAME_RE = re.compile(r'\b(?i:employee|for|named|called|about)\s+([A-Z][a-z]+)\s+([A-Z][a-z]+)\b')
+_NUMBER_RE = re.compile(r'\b(\d+(?:\.\d+)?)\b')
+_UNIT_RE = re.compile(r'\b(hours?|hrs|h|days?|dollars?|amount)\b|(\$)')
+_UNIT_ENTITIES = {
+    'hour': 'hours', 'hours': 'hours', 'hrs': 'hours', 'h': 'hours',
+    'day': 'days', 'days': 'days',
+    'dollar': 'amount', 'dollars': 'amount', 'amount': 'amount', '$': 'amount',
+}
+_REASON_RES = [
+    re.compile(r'for (.+?)(?:\.|$)'),
+    re.compile(r'because (.+?)(?:\.|$)'),
+    re.compile(r'due to (.+?)(?:\.|$)'),
+]
+
+# Separator used to join commands for batch intent scanning
+_BATCH_SEPARATOR = '\x1f'
+# Marks an intent that has not been searched for yet
+_NOT_SCANNED = object()
+
+# Intent ids index CommandProcessor._handlers_by_id; 0 is the unknown intent
+_INTENTS = tuple(sys.intern(intent) for intent in (
+    'unknown', 'attendance', 'clock_in', 'clock_out', 'leave', 'payroll', 'employee', 'report'
+))
+_INTENT_IDS = {intent: intent_id for intent_id, intent in enumerate(_INTENTS)}
+
+# Keyword groups used for fallback classification and handler decisions
+_KEYWORD_MAP = {
+    'attendance': ['attendance', 'present', 'absent', 'work', 'office'],
+    'clock_in': ['clock in', 'start work', 'arrive', 'check in'],
+    'clock_out': ['clock out', 'leave', 'finish', 'end work', 'check out'],
+    'leave': ['leave', 'vacation', 'holiday', 'time off', 'absent'],
+    'payroll': ['salary', 'pay', 'payroll', 'money', 'wages'],
+    'employee': ['employee', 'staff', 'worker', 'person', 'team'],
+    'report': ['report', 'summary', 'analytics', 'data']
+}
+_DEPARTMENTS = [sys.intern(dept) for dept in (
+    'engineering', 'hr', 'human resources', 'sales', 'marketing',
+    'finance', 'it', 'operations', 'design', 'legal'
+)]
+_REPORT_TYPES = ['attendance', 'payroll', 'performance', 'leave']
+
+_KEYWORD_GROUPS = {
+    **{f'intent:{intent}': keywords for intent, keywords in _KEYWORD_MAP.items()},
+    'department': _DEPARTMENTS,
+    'report_type': _REPORT_TYPES,
+    'relative_date': list(_REL_DATE_OFFSETS),
+    'leave_verb': ['request', 'apply', 'take'],
+    'create_verb': ['add', 'create', 'new'],
+    'search_verb': ['find', 'search', 'show'],
+    'reason_medical': ['sick', 'illness', 'doctor'],
+    'reason_vacation': ['vacation', 'holiday', 'trip'],
+    'reason_personal': ['personal', 'family'],
+}
+
+
+def _build_keyword_scanner(groups: Dict[str, List[str]]):
+    """Compile every keyword into one overlapping-match scanner.
+
+    The lookahead alternation reports the longest keyword starting at each
+    position; shorter keywords starting there are its prefixes. For each
+    keyword the scanner can report, the (category, keyword) hits it implies,
+    prefixes included, are precomputed. Together this yields every keyword
+    occurring in the text, like an Aho-Corasick pass.
+    """
+    owners = defaultdict(set)
+    for category, keywords in groups.items():
+        for keyword in keywords:
+            owners[sys.intern(keyword)].add(sys.intern(category))
+    keywords = sorted(owners, key=len, reverse=True)
+    hits = {
+        kw: tuple((category, other) for other in keywords if kw.startswith(other) for category in owners[other])
+        for kw in keywords
+    }
+    scanner = re.compile('(?=(' + '|'.join(map(re.escape, keywords)) + '))')
+    return scanner, hits
+
+
+_KEYWORD_SCANNER, _KEYWORD_HITS = _build_keyword_scanner(_KEYWORD_GROUPS)
+# (intent id, keyword category) pairs scored by the fallback classifier
+_KEYWORD_INTENTS = tuple((_INTENT_IDS[intent], f'intent:{intent}') for intent in _KEYWORD_MAP)
+
+
+def _predict_intent(classifier: Any, text: str) -> Tuple[int, float]:
+    """Classify one command with the intent model (runs in the model thread pool)"""
+    prediction = classifier(text)[0]
+    return _INTENT_IDS.get(prediction['label'], _INTENT_IDS['unknown']), float(prediction['score'])
+
+
+@dataclass(slots=True)
+class CommandResult:
+    """Result produced by a command handler"""
+    action: str
+    parameters: Dict[str, Any]
+    message: str
+    confidence: float = 0.0
+    suggestions: Optional[List[str]] = None
+
+
 class CommandProcessor:
     """Natural Language Processing for HRMS commands"""
     
     def __init__(self):
         self.intent_patterns = self._load_intent_patterns()
+        self._intent_union, self._intent_groups = self._build_intent_union(self.intent_patterns)
+        self._handlers_by_id = (
+            self._handle_unknown_command,
+            self._handle_attendance_command,
+            self._handle_clock_in_command,
+            self._handle_clock_out_command,
+            self._handle_leave_command,
+            self._handle_payroll_command,
+            self._handle_employee_command,
+            self._handle_report_command,
+        )
         self.entity_patterns = self._load_entity_patterns()
-        self.command_cache = {}
+        self.command_cache = OrderedDict()
+        self._cache_max = 1024
+        self.http_client = None
+        self.intent_classifier = None
+        self._model_pool: Optional[ThreadPoolExecutor] = None
+        # Languages the intent classifier handles without translation
+        self.native_languages = frozenset()
         self.initialized = False
         
-    async def initialize(self):
+    async def initialize(self, http_client: Optional[httpx.AsyncClient] = None):
         """Initialize NLP models and resources"""
         try:
             logger.info("Initializing NLP Command Processor...")
             
+            # Shared keep-alive connection pool for hosted model calls
+            self.http_client = http_client
+            
             # In production, load actual models here:
             # self.intent_classifier = pipeline("text-classification", model="microsoft/DialoGPT-medium")
+            # Model inference (torch releases the GIL) runs in this pool
+            self._model_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
             # self.ner_model = spacy.load("en_core_web_sm")
-            # openai.api_key = os.getenv("OPENAI_API_KEY")
+            # self.openai = openai.AsyncOpenAI(http_client=self.http_client)
+            
+            # With Hyperscan available, the intent union can be compiled into a
+            # single DFA database; match ids index into self._intent_groups:
+            # self._intent_db = hyperscan.Database()
+            # self._intent_db.compile(
+            #     expressions=[p.pattern.encode() for ps in self.intent_patterns.values() for p in ps],
+            #     ids=list(range(len(self._intent_groups))),
+            #     flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST] * len(self._intent_groups)
+            # )
+            # _classify_intent would then scan it and keep the hit with the
+            # leftmost start, then lowest id (the match the union regex picks):
+            # hits = []
+            # self._intent_db.scan(text.encode(), match_event_handler=lambda i, start, end, flags, ctx: hits.append((start, i)))
+            # group = min(hits)[1] if hits else None
+            
+            # The keyword patterns are English-only; a multilingual classifier
+            # (XLM-R, mBERT, LaBSE) would list its languages here, along with
+            # localized response messages for them
+            self.native_languages = frozenset({'en'})
             
             # For now, use pattern-based processing
             self.initialized = True
@@ -42,174 +208,225 @@ class CommandProcessor:
     async def cleanup(self):
         """Cleanup resources"""
         self.command_cache.clear()
+        if self._model_pool is not None:
+            self._model_pool.shutdown(wait=False, cancel_futures=True)
+            self._model_pool = None
         self.initialized = False
         logger.info("NLP Command Processor cleaned up")
     
-    async def health_check(self) -> bool:
+    def health_check(self) -> bool:
         """Check if NLP service is healthy"""
         return self.initialized
     
-    async def process_command(self, text: str, lang: str = "en", employee_id: Optional[int] = None) -> Dict[str, Any]:
+    async def process_command(self, text: str, lang: str = "en", employee_id: Optional[int] = None) -> Mapping[str, Any]:
         """Process natural language command and extract intent and entities"""
+        if self.intent_classifier is not None and (text.strip(), lang, employee_id) not in self.command_cache:
+            # Model inference is CPU-heavy; run it off the event loop
+            loop = asyncio.get_running_loop()
+            prediction = await loop.run_in_executor(
+                self._model_pool, _predict_intent, self.intent_classifier, text.strip()
+            )
+            return self._process(text, lang, employee_id, prediction=prediction)
+        return self._process(text, lang, employee_id)
+    
+    async def process_batch(self, texts: List[str], lang: str = "en", employee_id: Optional[int] = None) -> List[Mapping[str, Any]]:
+        """Process several commands, classifying their intents in one regex pass (or with the model)"""
+        results = [None] * len(texts)
+        pending = []
+        for index, text in enumerate(texts):
+            original_text = text.strip()
+            cache_key = (original_text, lang, employee_id)
+            if cache_key in self.command_cache:
+                self.command_cache.move_to_end(cache_key)
+                results[index] = self.command_cache[cache_key]
+            else:
+                pending.append((index, original_text.lower()))
+        
+        # With a model loaded, classify like process_command does, in parallel
+        if self.intent_classifier is not None and pending:
+            loop = asyncio.get_running_loop()
+            predictions = await asyncio.gather(*(
+                loop.run_in_executor(self._model_pool, _predict_intent, self.intent_classifier, texts[index].strip())
+                for index, _ in pending
+            ))
+            for (index, _), prediction in zip(pending, predictions):
+                results[index] = self._process(texts[index], lang, employee_id, prediction=prediction)
+            return results
+        
+        # Scan all uncached commands at once; starts[i] is the offset of pending[i]
+        starts = []
+        offset = 0
+        for _, lowered in pending:
+            starts.append(offset)
+            offset += len(lowered) + len(_BATCH_SEPARATOR)
+        joined = _BATCH_SEPARATOR.join(lowered for _, lowered in pending)
+        
+        matches = {}
+        ambiguous = set()
+        for match in self._intent_union.finditer(joined):
+            first = bisect_right(starts, match.start()) - 1
+            last = bisect_right(starts, match.end() - 1) - 1
+            if first != last:
+                # Match spans a separator; classify these commands one by one
+                ambiguous.update(range(first, last + 1))
+            elif first not in matches:
+                matches[first] = match
+        
+        for position, (index, _) in enumerate(pending):
+            intent_match = _NOT_SCANNED if position in ambiguous else matches.get(position)
+            results[index] = self._process(texts[index], lang, employee_id, intent_match)
+        
+        return results
+    
+    def _process(self, text: str, lang: str, employee_id: Optional[int], intent_match: Any = _NOT_SCANNED, prediction: Optional[Tuple[int, float]] = None) -> Mapping[str, Any]:
+        """Run the command pipeline, optionally with a pre-computed intent match or model prediction"""
         try:
-            # Normalize input
-            text = text.strip().lower()
+            # Normalize input, keeping the original casing for name extraction
+            original_text = text.strip()
+            text = original_text.lower()
             
             # Check cache first
-            cache_key = f"{text}_{lang}_{employee_id}"
+            cache_key = (original_text, lang, employee_id)
             if cache_key in self.command_cache:
+                self.command_cache.move_to_end(cache_key)
                 return self.command_cache[cache_key]
             
+            # Find all known keywords in a single pass
+            keywords = self._scan_keywords(text)
+            now = datetime.now()
+            
             # Classify intent
-            intent, confidence = await self._classify_intent(text)
+            if prediction is not None:
+                intent_id, confidence = prediction
+            else:
+                intent_id, confidence = self._classify_intent(text, keywords, intent_match)
             
             # Extract entities
-            entities = await self._extract_entities(text)
+            entities = self._extract_entities(text, original_text, keywords, now)
             
             # Generate response
-            result = await self._generate_response(intent, entities, text, employee_id)
-            result['confidence'] = confidence
+            result = self._generate_response(intent_id, entities, text, employee_id, keywords, now)
+            result.confidence = confidence
             
-            # Cache result
+            # Cache result (read-only, so callers can't alter cached entries)
+            result = MappingProxyType(asdict(result))
+            if len(self.command_cache) >= self._cache_max:
+                self.command_cache.popitem(last=False)
             self.command_cache[cache_key] = result
             
             return result
             
         except Exception as e:
             logger.error(f"Command processing error: {e}")
-            return {
-                'action': 'error',
-                'message': f'Sorry, I couldn\'t understand that command: {str(e)}',
-                'parameters': {},
-                'confidence': 0.0
-            }
+            return asdict(CommandResult(
+                action='error',
+                parameters={},
+                message=f'Sorry, I couldn\'t understand that command: {str(e)}'
+            ))
     
-    async def _classify_intent(self, text: str) -> Tuple[str, float]:
-        """Classify the intent of the input text"""
-        
-        # Pattern-based intent classification
-        for intent, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, text, re.IGNORECASE):
-                    confidence = self._calculate_pattern_confidence(text, pattern)
-                    return intent, confidence
+    def _scan_keywords(self, text: str) -> Dict[str, Set[str]]:
+        """Return the keywords found in text, grouped by category"""
+        hits = defaultdict(set)
+        for match in _KEYWORD_SCANNER.finditer(text):
+            for category, keyword in _KEYWORD_HITS[match.group(1)]:
+                hits[category].add(keyword)
+        return hits
+    
+    def _classify_intent(self, text: str, keywords: Dict[str, Set[str]], match: Any = _NOT_SCANNED) -> Tuple[int, float]:
+        """Classify the intent of the input text, returning its intent id"""
+        
+        # Pattern-based intent classification: one pass over the union regex,
+        # the matching group index identifies the (intent, pattern) pair
+        if match is _NOT_SCANNED:
+            match = self._intent_union.search(text)
+        if match:
+            intent_id, pattern_length = self._intent_groups[match.lastindex - 1]
+            # Higher confidence for longer patterns relative to the text,
+            # clamped to [0.3, 0.9]
+            confidence = max(0.3, min(0.9, pattern_length / (len(text) + 1)))
+            return intent_id, confidence
         
         # If no pattern matches, try keyword matching
-        return await self._keyword_based_classification(text)
-    
-    def _calculate_pattern_confidence(self, text: str, pattern: str) -> float:
-        """Calculate confidence score for pattern matching"""
-        # Simple confidence based on pattern specificity and text length
-        matches = len(re.findall(pattern, text, re.IGNORECASE))
-        pattern_length = len(pattern.replace('[.*?]', '').replace('\\b', ''))
-        text_length = len(text)
-        
-        # Higher confidence for longer patterns and exact matches
-        confidence = min(0.9, (matches * pattern_length) / (text_length + 1))
-        return max(0.3, confidence)  # Minimum confidence of 0.3
+        return self._keyword_based_classification(keywords)
     
-    async def _keyword_based_classification(self, text: str) -> Tuple[str, float]:
+    def _keyword_based_classification(self, keywords: Dict[str, Set[str]]) -> Tuple[int, float]:
         """Fallback keyword-based classification"""
         
-        keyword_map = {
-            'attendance': ['attendance', 'present', 'absent', 'work', 'office'],
-            'clock_in': ['clock in', 'start work', 'arrive', 'check in'],
-            'clock_out': ['clock out', 'leave', 'finish', 'end work', 'check out'],
-            'leave': ['leave', 'vacation', 'holiday', 'time off', 'absent'],
-            'payroll': ['salary', 'pay', 'payroll', 'money', 'wages'],
-            'employee': ['employee', 'staff', 'worker', 'person', 'team'],
-            'report': ['report', 'summary', 'analytics', 'data']
-        }
-        
         max_score = 0
-        best_intent = 'unknown'
+        best_intent_id = _INTENT_IDS['unknown']
         
-        for intent, keywords in keyword_map.items():
-            score = sum(1 for keyword in keywords if keyword in text)
+        for intent_id, category in _KEYWORD_INTENTS:
+            score = len(keywords[category])
             if score > max_score:
                 max_score = score
-                best_intent = intent
+                best_intent_id = intent_id
         
         confidence = min(0.7, max_score / 5.0) if max_score > 0 else 0.1
-        return best_intent, confidence
+        return best_intent_id, confidence
     
-    async def _extract_entities(self, text: str) -> Dict[str, Any]:
+    def _extract_entities(self, text: str, original_text: str, keywords: Dict[str, Set[str]], now: datetime) -> Dict[str, Any]:
         """Extract entities from the input text"""
         entities = {}
         
+        # Cheap prefilters: only run extractors that could possibly match
+        has_digit = _HAS_DIGIT_RE.search(text) is not None
+        has_upper = _HAS_UPPER_RE.search(original_text) is not None
+        
         # Extract dates
-        date_entities = self._extract_dates(text)
-        if date_entities:
-            entities.update(date_entities)
+        if has_digit or keywords['relative_date']:
+            date_entities = self._extract_dates(text, now)
+            if date_entities:
+                entities.update(date_entities)
         
         # Extract employee names/IDs
-        employee_entities = self._extract_employee_references(text)
-        if employee_entities:
-            entities.update(employee_entities)
+        if has_digit or has_upper:
+            employee_entities = self._extract_employee_references(text, original_text)
+            if employee_entities:
+                entities.update(employee_entities)
         
         # Extract numbers
-        number_entities = self._extract_numbers(text)
-        if number_entities:
-            entities.update(number_entities)
+        if has_digit:
+            number_entities = self._extract_numbers(text)
+            if number_entities:
+                entities.update(number_entities)
         
         # Extract departments
-        department_entities = self._extract_departments(text)
-        if department_entities:
-            entities.update(department_entities)
+        if keywords['department']:
+            department_entities = self._extract_departments(keywords)
+            if department_entities:
+                entities.update(department_entities)
         
         return entities
     
-    def _extract_dates(self, text: str) -> Dict[str, Any]:
+    def _extract_dates(self, text: str, now: datetime) -> Dict[str, Any]:
         """Extract date-related entities"""
         entities = {}
         
-        # Common date patterns
-        date_patterns = {
-            'today': datetime.now().date(),
-            'tomorrow': (datetime.now() + timedelta(days=1)).date(),
-            'yesterday': (datetime.now() - timedelta(days=1)).date(),
-            'this week': datetime.now().date(),
-            'next week': (datetime.now() + timedelta(weeks=1)).date(),
-            'last week': (datetime.now() - timedelta(weeks=1)).date(),
-        }
-        
-        for pattern, date_value in date_patterns.items():
-            if pattern in text.lower():
-                entities['date'] = date_value.isoformat()
-                break
+        # Relative date phrases (today, next week, ...)
+        match = _REL_DATE_RE.search(text)
+        if match:
+            offset = timedelta(days=_REL_DATE_OFFSETS[match.group(1)])
+            entities['date'] = (now.date() + offset).isoformat()
         
         # Specific date patterns (YYYY-MM-DD, MM/DD/YYYY, etc.)
-        date_regex_patterns = [
-            r'\b(\d{4}[-/]\d{1,2}[-/]\d{1,2})\b',  # YYYY-MM-DD or YYYY/MM/DD
-            r'\b(\d{1,2}[-/]\d{1,2}[-/]\d{4})\b',  # MM-DD-YYYY or MM/DD/YYYY
-            r'\b(\d{1,2}[-/]\d{1,2}[-/]\d{2})\b',  # MM-DD-YY or MM/DD/YY
-        ]
-        
-        for pattern in date_regex_patterns:
-            match = re.search(pattern, text)
-            if match:
-                try:
-                    # Parse the date (simplified parsing)
-                    date_str = match.group(1)
-                    # You'd use a proper date parser here like dateutil
-                    entities['specific_date'] = date_str
-                    break
-                except:
-                    continue
+        match = _DATE_RE.search(text)
+        if match:
+            # You'd use a proper date parser here like dateutil
+            entities['specific_date'] = match.group(1)
         
         return entities
     
-    def _extract_employee_references(self, text: str) -> Dict[str, Any]:
+    def _extract_employee_references(self, text: str, original_text: str) -> Dict[str, Any]:
         """Extract employee name or ID references"""
         entities = {}
         
         # Employee ID pattern
-        emp_id_match = re.search(r'\b(?:employee|emp)\s*(?:id|#)?\s*(\d+)\b', text, re.IGNORECASE)
+        emp_id_match = _EMP_ID_RE.search(text)
         if emp_id_match:
             entities['employee_id'] = int(emp_id_match.group(1))
         
-        # Simple name patterns (first name + last name)
-        name_match = re.search(r'\b([A-Z][a-z]+)\s+([A-Z][a-z]+)\b', text)
+        # Simple name patterns (cue word + first name + last name)
+        name_match = _NAME_RE.search(original_text)
         if name_match:
             entities['employee_name'] = f"{name_match.group(1)} {name_match.group(2)}"
         
@@ -219,180 +436,157 @@ class CommandProcessor:
         """Extract numeric entities"""
         entities = {}
         
-        # Extract numbers for hours, days, amounts, etc.
-        number_matches = re.findall(r'\b(\d+(?:\.\d+)?)\b', text)
-        if number_matches:
-            # Context-based number interpretation
-            if any(word in text.lower() for word in ['hour', 'hrs', 'h']):
-                entities['hours'] = float(number_matches[0])
-            elif any(word in text.lower() for word in ['day', 'days']):
-                entities['days'] = int(number_matches[0])
-            elif any(word in text.lower() for word in ['dollar', '$', 'amount']):
-                entities['amount'] = float(number_matches[0])
-            else:
-                entities['number'] = float(number_matches[0])
+        # Extract the first number for hours, days, amounts, etc.
+        match = _NUMBER_RE.search(text)
+        if match:
+            number = match.group(1)
+            # Context-based number interpretation from the first unit word
+            unit = _UNIT_RE.search(text)
+            kind = _UNIT_ENTITIES[unit.group(1) or unit.group(2)] if unit else 'number'
+            entities[kind] = int(number) if kind == 'days' else float(number)
         
         return entities
     
-    def _extract_departments(self, text: str) -> Dict[str, Any]:
+    def _extract_departments(self, keywords: Dict[str, Set[str]]) -> Dict[str, Any]:
         """Extract department references"""
         entities = {}
         
-        departments = [
-            'engineering', 'hr', 'human resources', 'sales', 'marketing', 
-            'finance', 'it', 'operations', 'design', 'legal'
-        ]
-        
-        for dept in departments:
-            if dept in text.lower():
+        found = keywords['department']
+        for dept in _DEPARTMENTS:
+            if dept in found:
                 entities['department'] = dept.title()
                 break
         
         return entities
     
-    async def _generate_response(self, intent: str, entities: Dict[str, Any], text: str, employee_id: Optional[int]) -> Dict[str, Any]:
+    def _generate_response(self, intent_id: int, entities: Dict[str, Any], text: str, employee_id: Optional[int], keywords: Dict[str, Set[str]], now: datetime) -> CommandResult:
         """Generate appropriate response based on intent and entities"""
-        
-        response_map = {
-            'attendance': self._handle_attendance_command,
-            'clock_in': self._handle_clock_in_command,
-            'clock_out': self._handle_clock_out_command,
-            'leave': self._handle_leave_command,
-            'payroll': self._handle_payroll_command,
-            'employee': self._handle_employee_command,
-            'report': self._handle_report_command,
-        }
-        
-        handler = response_map.get(intent, self._handle_unknown_command)
-        return await handler(entities, text, employee_id)
+        return self._handlers_by_id[intent_id](entities, text, employee_id, keywords, now)
     
-    async def _handle_attendance_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int]) -> Dict[str, Any]:
+    def _handle_attendance_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int], keywords: Dict[str, Set[str]], now: datetime) -> CommandResult:
         """Handle attendance-related commands"""
-        return {
-            'action': 'view_attendance',
-            'parameters': {
+        return CommandResult(
+            action='view_attendance',
+            parameters={
                 'employee_id': entities.get('employee_id', employee_id),
                 'date': entities.get('date'),
                 'employee_name': entities.get('employee_name')
             },
-            'message': 'I\'ll retrieve the attendance information for you.'
-        }
+            message='I\'ll retrieve the attendance information for you.'
+        )
     
-    async def _handle_clock_in_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int]) -> Dict[str, Any]:
+    def _handle_clock_in_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int], keywords: Dict[str, Set[str]], now: datetime) -> CommandResult:
         """Handle clock in commands"""
-        return {
-            'action': 'clock_in',
-            'parameters': {
+        return CommandResult(
+            action='clock_in',
+            parameters={
                 'employee_id': employee_id,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': now.isoformat()
             },
-            'message': 'I\'ll clock you in right away.'
-        }
+            message='I\'ll clock you in right away.'
+        )
     
-    async def _handle_clock_out_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int]) -> Dict[str, Any]:
+    def _handle_clock_out_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int], keywords: Dict[str, Set[str]], now: datetime) -> CommandResult:
         """Handle clock out commands"""
-        return {
-            'action': 'clock_out',
-            'parameters': {
+        return CommandResult(
+            action='clock_out',
+            parameters={
                 'employee_id': employee_id,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': now.isoformat()
             },
-            'message': 'I\'ll clock you out now.'
-        }
+            message='I\'ll clock you out now.'
+        )
     
-    async def _handle_leave_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int]) -> Dict[str, Any]:
+    def _handle_leave_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int], keywords: Dict[str, Set[str]], now: datetime) -> CommandResult:
         """Handle leave request commands"""
         
         # Determine if it's a request or view
-        if any(word in text for word in ['request', 'apply', 'take']):
-            return {
-                'action': 'request_leave',
-                'parameters': {
+        if keywords['leave_verb']:
+            return CommandResult(
+                action='request_leave',
+                parameters={
                     'employee_id': employee_id,
                     'start_date': entities.get('date'),
                     'end_date': entities.get('end_date'),
                     'days': entities.get('days'),
-                    'reason': self._extract_leave_reason(text)
+                    'reason': self._extract_leave_reason(text, keywords)
                 },
-                'message': 'I\'ll submit your leave request.'
-            }
+                message='I\'ll submit your leave request.'
+            )
         else:
-            return {
-                'action': 'view_leave',
-                'parameters': {
+            return CommandResult(
+                action='view_leave',
+                parameters={
                     'employee_id': entities.get('employee_id', employee_id)
                 },
-                'message': 'I\'ll show you the leave information.'
-            }
+                message='I\'ll show you the leave information.'
+            )
     
-    async def _handle_payroll_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int]) -> Dict[str, Any]:
+    def _handle_payroll_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int], keywords: Dict[str, Set[str]], now: datetime) -> CommandResult:
         """Handle payroll-related commands"""
-        return {
-            'action': 'view_payroll',
-            'parameters': {
+        return CommandResult(
+            action='view_payroll',
+            parameters={
                 'employee_id': entities.get('employee_id', employee_id),
                 'month': entities.get('month'),
                 'year': entities.get('year')
             },
-            'message': 'I\'ll retrieve your payroll information.'
-        }
+            message='I\'ll retrieve your payroll information.'
+        )
     
-    async def _handle_employee_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int]) -> Dict[str, Any]:
+    def _handle_employee_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int], keywords: Dict[str, Set[str]], now: datetime) -> CommandResult:
         """Handle employee-related commands"""
         
-        if any(word in text for word in ['add', 'create', 'new']):
-            return {
-                'action': 'create_employee',
-                'parameters': {
+        if keywords['create_verb']:
+            return CommandResult(
+                action='create_employee',
+                parameters={
                     'name': entities.get('employee_name'),
                     'department': entities.get('department')
                 },
-                'message': 'I\'ll help you create a new employee record.'
-            }
-        elif any(word in text for word in ['find', 'search', 'show']):
-            return {
-                'action': 'search_employees',
-                'parameters': {
+                message='I\'ll help you create a new employee record.'
+            )
+        elif keywords['search_verb']:
+            return CommandResult(
+                action='search_employees',
+                parameters={
                     'name': entities.get('employee_name'),
                     'department': entities.get('department'),
                     'employee_id': entities.get('employee_id')
                 },
-                'message': 'I\'ll search for employees matching your criteria.'
-            }
+                message='I\'ll search for employees matching your criteria.'
+            )
         else:
-            return {
-                'action': 'view_employees',
-                'parameters': {
+            return CommandResult(
+                action='view_employees',
+                parameters={
                     'department': entities.get('department')
                 },
-                'message': 'I\'ll show you the employee information.'
-            }
+                message='I\'ll show you the employee information.'
+            )
     
-    async def _handle_report_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int]) -> Dict[str, Any]:
+    def _handle_report_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int], keywords: Dict[str, Set[str]], now: datetime) -> CommandResult:
         """Handle report generation commands"""
         
         report_type = 'general'
-        if 'attendance' in text:
-            report_type = 'attendance'
-        elif 'payroll' in text:
-            report_type = 'payroll'
-        elif 'performance' in text:
-            report_type = 'performance'
-        elif 'leave' in text:
-            report_type = 'leave'
-        
-        return {
-            'action': 'generate_report',
-            'parameters': {
+        found = keywords['report_type']
+        for candidate in _REPORT_TYPES:
+            if candidate in found:
+                report_type = candidate
+                break
+        
+        return CommandResult(
+            action='generate_report',
+            parameters={
                 'report_type': report_type,
                 'department': entities.get('department'),
                 'date_from': entities.get('date'),
                 'date_to': entities.get('end_date')
             },
-            'message': f'I\'ll generate a {report_type} report for you.'
-        }
+            message=f'I\'ll generate a {report_type} report for you.'
+        )
     
-    async def _handle_unknown_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int]) -> Dict[str, Any]:
+    def _handle_unknown_command(self, entities: Dict[str, Any], text: str, employee_id: Optional[int], keywords: Dict[str, Set[str]], now: datetime) -> CommandResult:
         """Handle unknown or unrecognized commands"""
         
         suggestions = [
@@ -402,41 +596,35 @@ class CommandProcessor:
             "View employees by saying 'show employees in engineering'"
         ]
         
-        return {
-            'action': 'unknown',
-            'parameters': {'original_text': text},
-            'message': 'I\'m not sure how to help with that. Here are some things you can try:',
-            'suggestions': suggestions
-        }
+        return CommandResult(
+            action='unknown',
+            parameters={'original_text': text},
+            message='I\'m not sure how to help with that. Here are some things you can try:',
+            suggestions=suggestions
+        )
     
-    def _extract_leave_reason(self, text: str) -> str:
+    def _extract_leave_reason(self, text: str, keywords: Dict[str, Set[str]]) -> str:
         """Extract reason from leave request text"""
         
         # Look for common reason patterns
-        reason_patterns = [
-            r'for (.+?)(?:\.|$)',
-            r'because (.+?)(?:\.|$)',
-            r'due to (.+?)(?:\.|$)'
-        ]
-        
-        for pattern in reason_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _REASON_RES:
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip()
         
         # Default reasons based on keywords
-        if any(word in text.lower() for word in ['sick', 'illness', 'doctor']):
+        if keywords['reason_medical']:
             return 'Medical leave'
-        elif any(word in text.lower() for word in ['vacation', 'holiday', 'trip']):
+        elif keywords['reason_vacation']:
             return 'Vacation'
-        elif any(word in text.lower() for word in ['personal', 'family']):
+        elif keywords['reason_personal']:
             return 'Personal leave'
         
         return 'Leave request'
     
-    def _load_intent_patterns(self) -> Dict[str, List[str]]:
-        """Load intent classification patterns"""
-        return {
+    def _load_intent_patterns(self) -> Dict[str, List[re.Pattern]]:
+        """Load and compile intent classification patterns"""
+        raw = {
             'attendance': [
                 r'\b(?:show|view|check|see)\s+(?:my\s+)?attendance\b',
                 r'\b(?:attendance|present|absent)\s+(?:for|on|today|yesterday)\b',
@@ -480,10 +668,26 @@ class CommandProcessor:
                 r'\bshow\s+(?:me\s+)?(?:stats|data|analytics)\b'
             ]
         }
+        return {intent: [re.compile(p, re.IGNORECASE) for p in patterns] for intent, patterns in raw.items()}
     
-    def _load_entity_patterns(self) -> Dict[str, List[str]]:
-        """Load entity extraction patterns"""
-        return {
+    def _build_intent_union(self, intent_patterns: Dict[str, List[re.Pattern]]) -> Tuple[re.Pattern, List[Tuple[int, int]]]:
+        """Combine all intent patterns into a single alternation regex"""
+        groups = []
+        alternatives = []
+        for intent, patterns in intent_patterns.items():
+            for pattern in patterns:
+                # Pattern specificity used for confidence scoring
+                pattern_length = len(pattern.pattern.replace('[.*?]', '').replace('\\b', ''))
+                groups.append((_INTENT_IDS[intent], pattern_length))
+                alternatives.append(f"({pattern.pattern})")
+        # The intent patterns use no lookaround or backreferences, so with
+        # google-re2 installed the union can run on RE2's linear-time engine:
+        # return re2.compile("(?i)" + "|".join(alternatives)), groups
+        return re.compile("|".join(alternatives), re.IGNORECASE), groups
+    
+    def _load_entity_patterns(self) -> Dict[str, List[re.Pattern]]:
+        """Load and compile entity extraction patterns"""
+        raw = {
             'date': [
                 r'\b(?:today|tomorrow|yesterday)\b',
                 r'\b(?:this|next|last)\s+(?:week|month|year)\b',
@@ -504,4 +708,5 @@ class CommandProcessor:
                 r'\b\d{1,2}:\d{2}(?:\s*(?:am|pm))?\b',
                 r'\b(?:morning|afternoon|evening|night)\b'
             ]
-        }   
\ No newline at end of file
+        }
+        return {entity: [re.compile(p, re.IGNORECASE) for p in patterns] for entity, patterns in raw.items()}
@@ -1,39 +1,219 @@
+import io
 import os
+import asyncio
+import httpx
+import hashlib
 import tempfile
 import logging
-from typing import Optional, Dict, Any
-import uuid
-from datetime import datetime
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping
+import itertools
+import secrets
 
 # For production, you'd use these imports:
 # import speech_recognition as sr
 # from gtts import gTTS
 # import whisper
+# import torch
+# from faster_whisper import WhisperModel
+# from transformers import WhisperForConditionalGeneration, WhisperProcessor
 # from pydub import AudioSegment
+# import numpy as np
 
 logger = logging.getLogger(__name__)
 
+_SPEECH_LANGUAGES = MappingProxyType({
+    "en": "English",
+    "es": "Spanish",
+    "fr": "French",
+    "de": "German",
+    "it": "Italian",
+    "pt": "Portuguese",
+    "zh": "Chinese",
+    "ja": "Japanese",
+    "ko": "Korean",
+    "ru": "Russian",
+    "ar": "Arabic",
+    "hi": "Hindi"
+})
+
+# Models are loaded once per worker process and reused across calls
+_worker_models: Dict[str, Any] = {}
+
+
+def _init_worker(compute_type: Optional[str] = None):
+    """Load and warm up models when a worker process starts"""
+    
+    # In production, pay model load and compilation cost here rather than on
+    # the first request:
+    
+    """
+    # faster-whisper (CTranslate2), quantized to int8 on CPU and int8/fp16 on GPU:
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    compute_type = compute_type or ("int8_float16" if device == "cuda" else "int8")
+    model = WhisperModel("base", device=device, compute_type=compute_type)
+    
+    # Or the PyTorch Whisper with fused SDPA attention, compiled:
+    model = WhisperForConditionalGeneration.from_pretrained(
+        "openai/whisper-base", attn_implementation="sdpa", torch_dtype=torch.float16
+    ).to(device)
+    model = torch.compile(model, mode="reduce-overhead", fullgraph=False)
+    
+    # One second of silence triggers kernel selection / graph capture
+    list(model.transcribe(np.zeros(16000, dtype=np.float32))[0])
+    _worker_models["whisper"] = model
+    """
+
+
+def _worker_ready() -> int:
+    """No-op task that forces a worker (and its _init_worker) to start"""
+    return os.getpid()
+
+
+def _transcribe_audio(audio_data: bytes, language: str, prompt: Optional[str] = None) -> str:
+    """Transcribe raw audio bytes, conditioned on prior session text (runs in a worker process)"""
+    
+    # Mock implementation for demo
+    # In production, you'd use actual speech recognition:
+    
+    """
+    # Using SpeechRecognition library (AudioFile accepts file-like objects):
+    recognizer = _worker_models.get("recognizer")
+    if recognizer is None:
+        recognizer = _worker_models["recognizer"] = sr.Recognizer()
+    try:
+        with sr.AudioFile(io.BytesIO(audio_data)) as source:
+            recorded = recognizer.record(source)
+            return recognizer.recognize_google(recorded, language=language)
+    except sr.UnknownValueError:
+        raise Exception("Could not understand audio")
+    except sr.RequestError as e:
+        raise Exception(f"Speech recognition service error: {e}")
+    
+    # Or using the Whisper model loaded by _init_worker, which takes a path
+    # or a 16 kHz float32 array (shown here for raw 16-bit PCM input):
+    model = _worker_models["whisper"]
+    samples = np.frombuffer(audio_data, np.int16).astype(np.float32) / 32768.0
+    segments, _ = model.transcribe(samples, language=language, initial_prompt=prompt)
+    return "".join(segment.text for segment in segments)
+    
+    # With the Hugging Face model, decode with the KV cache enabled so each
+    # step attends over cached keys/values instead of re-running the prefix:
+    features = processor(samples, sampling_rate=16000, return_tensors="pt").input_features
+    prompt_ids = processor.get_prompt_ids(prompt, return_tensors="pt") if prompt else None
+    tokens = model.generate(features, language=language, prompt_ids=prompt_ids, use_cache=True)
+    return processor.batch_decode(tokens, skip_special_tokens=True)[0]
+    """
+    
+    # Mock responses for demo
+    mock_responses = {
+        "en": "Show me my attendance for this week",
+        "es": "Muéstrame mi asistencia de esta semana",
+        "fr": "Montrez-moi ma présence cette semaine"
+    }
+    
+    return mock_responses.get(language, "Show me my attendance")
+
+
+def _synthesize_speech(text: str, language: str, output_path: str, voice: Optional[str] = None):
+    """Synthesize speech into an audio file (runs in a worker process)"""
+    
+    # Mock implementation for demo
+    # In production, you'd use actual TTS:
+    
+    """
+    # Using gTTS (Google Text-to-Speech):
+    tts = gTTS(text=text, lang=language, slow=False)
+    tts.save(output_path)
+    
+    # Or using other TTS engines like:
+    # - Azure Cognitive Services Speech
+    # - AWS Polly
+    # - OpenAI TTS API
+    # - Local TTS models like Coqui TTS
+    """
+    
+    # For demo, create a placeholder file
+    with open(output_path, "wb") as f:
+        f.write(b"mock_audio_data")  # In real implementation, this would be actual audio
+
+
+def _synthesize_speech_bytes(text: str, language: str, voice: Optional[str] = None) -> bytes:
+    """Synthesize speech into an in-memory MP3 buffer (runs in a worker process)"""
+    buffer = io.BytesIO()
+    
+    # In production, you'd write the TTS output straight into the buffer:
+    """
+    tts = gTTS(text=text, lang=language, slow=False)
+    tts.write_to_fp(buffer)
+    return buffer.getvalue()
+    """
+    
+    buffer.write(b"mock_audio_data")  # In real implementation, this would be actual audio
+    return buffer.getvalue()
+
+
 class SpeechProcessor:
     """Speech-to-Text and Text-to-Speech processing"""
     
-    def __init__(self):
+    def __init__(self, compute_type: Optional[str] = None, max_workers: int = 2):
         self.temp_dir = tempfile.gettempdir()
         self.audio_dir = os.path.join(self.temp_dir, "robohr_audio")
         self.recognizer = None
+        self.http_client = None
         self.whisper_model = None
+        # Whisper precision ("int8", "int8_float16", "float16", "bfloat16", ...);
+        # None picks int8 on CPU and int8_float16 on GPU
+        self.compute_type = compute_type
+        self.transcript_cache = OrderedDict()
+        self._cache_max = 2048
+        # Trailing transcript per streaming session, fed back as decoder context
+        self._session_context = OrderedDict()
+        self._session_max = 256
+        self._session_context_chars = 200
+        # Each worker holds its own model copy, so keep the pool small
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Unique per process (the random part survives pid reuse across restarts)
+        self._file_prefix = f"{os.getpid()}_{secrets.token_hex(4)}"
+        self._file_counter = itertools.count()
         self.initialized = False
         
         # Ensure audio directory exists
         os.makedirs(self.audio_dir, exist_ok=True)
     
-    async def initialize(self):
+    async def initialize(self, http_client: Optional[httpx.AsyncClient] = None):
         """Initialize speech processing models"""
         try:
             logger.info("Initializing Speech Processor...")
             
+            # Shared keep-alive connection pool for cloud speech APIs
+            self.http_client = http_client
+            
             # In production, initialize actual models:
             # self.recognizer = sr.Recognizer()
-            # self.whisper_model = whisper.load_model("base")
+            # Whisper itself is loaded, compiled and warmed up inside each
+            # worker process, see _init_worker
+            
+            # Recognition and synthesis are CPU-bound; keep them off the event loop.
+            # Workers come from a forkserver: forking this process would copy its
+            # threads' held locks and the root logger's queue handler
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=_init_worker,
+                initargs=(self.compute_type,)
+            )
+            
+            # Workers start lazily on submit; start them all now so model
+            # loading happens here instead of on the first requests
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(
+                loop.run_in_executor(self._executor, _worker_ready) for _ in range(self.max_workers)
+            ))
             
             # For now, use mock initialization
             self.initialized = True
@@ -46,13 +226,21 @@ class SpeechProcessor:
     async def cleanup(self):
         """Cleanup resources and temporary files"""
         try:
+            self.transcript_cache.clear()
+            self._session_context.clear()
+            
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            
             # Clean up temporary audio files
-            import glob
-            for file in glob.glob(os.path.join(self.audio_dir, "*.wav")):
-                try:
-                    os.remove(file)
-                except:
-                    pass
+            with os.scandir(self.audio_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".wav"):
+                        try:
+                            os.remove(entry.path)
+                        except:
+                            pass
             
             self.initialized = False
             logger.info("Speech Processor cleaned up")
@@ -60,30 +248,32 @@ class SpeechProcessor:
         except Exception as e:
             logger.error(f"Cleanup error: {e}")
     
-    async def health_check(self) -> bool:
+    def health_check(self) -> bool:
         """Check if speech service is healthy"""
         return self.initialized
     
-    async def speech_to_text(self, audio_data: bytes, language: str = "en") -> str:
-        """Convert audio data to text"""
+    async def speech_to_text(self, audio_data: bytes, language: str = "en", session_id: Optional[str] = None) -> str:
+        """Convert audio data to text; chunks sharing a session_id continue one stream"""
         try:
             logger.info(f"Processing speech-to-text for language: {language}")
             
-            # Save audio data to temporary file
-            temp_filename = f"speech_{uuid.uuid4().hex}.wav"
-            temp_path = os.path.join(self.audio_dir, temp_filename)
+            prompt = self._session_context.get(session_id) if session_id else None
             
-            with open(temp_path, "wb") as f:
-                f.write(audio_data)
+            # Repeated utterances are served from the transcript cache
+            cache_key = (self._fingerprint_audio(audio_data), language, prompt)
+            if cache_key in self.transcript_cache:
+                self.transcript_cache.move_to_end(cache_key)
+                transcript = self.transcript_cache[cache_key]
+            else:
+                # Process with speech recognition straight from memory
+                transcript = await self._process_audio_stream(audio_data, language, prompt)
+                
+                if len(self.transcript_cache) >= self._cache_max:
+                    self.transcript_cache.popitem(last=False)
+                self.transcript_cache[cache_key] = transcript
             
-            # Process with speech recognition
-            transcript = await self._process_audio_file(temp_path, language)
-            
-            # Clean up temporary file
-            try:
-                os.remove(temp_path)
-            except:
-                pass
+            if session_id:
+                self._update_session(session_id, prompt, transcript)
             
             return transcript
             
@@ -91,37 +281,32 @@ class SpeechProcessor:
             logger.error(f"Speech-to-text error: {e}")
             raise Exception(f"Speech recognition failed: {str(e)}")
     
-    async def _process_audio_file(self, file_path: str, language: str) -> str:
-        """Process audio file and return transcript"""
-        
-        # Mock implementation for demo
-        # In production, you'd use actual speech recognition:
-        
-        """
-        # Using SpeechRecognition library:
-        try:
-            with sr.AudioFile(file_path) as source:
-                audio = self.recognizer.record(source)
-                transcript = self.recognizer.recognize_google(audio, language=language)
-                return transcript
-        except sr.UnknownValueError:
-            raise Exception("Could not understand audio")
-        except sr.RequestError as e:
-            raise Exception(f"Speech recognition service error: {e}")
-        
-        # Or using Whisper:
-        result = self.whisper_model.transcribe(file_path, language=language)
-        return result["text"]
-        """
-        
-        # Mock responses for demo
-        mock_responses = {
-            "en": "Show me my attendance for this week",
-            "es": "Muéstrame mi asistencia de esta semana",
-            "fr": "Montrez-moi ma présence cette semaine"
-        }
-        
-        return mock_responses.get(language, "Show me my attendance")
+    def _update_session(self, session_id: str, prompt: Optional[str], transcript: str):
+        """Keep the tail of a session's transcript as context for its next chunk"""
+        context = f"{prompt} {transcript}" if prompt else transcript
+        self._session_context[session_id] = context[-self._session_context_chars:]
+        self._session_context.move_to_end(session_id)
+        if len(self._session_context) > self._session_max:
+            self._session_context.popitem(last=False)
+    
+    def end_session(self, session_id: str):
+        """Drop the decoding context of a finished streaming session"""
+        self._session_context.pop(session_id, None)
+    
+    def _fingerprint_audio(self, audio_data: bytes) -> str:
+        """Content hash identifying an exact audio payload"""
+        return hashlib.blake2b(audio_data, digest_size=16).hexdigest()
+    
+    async def _run_cpu_bound(self, func, *args):
+        """Run CPU-bound work in the process pool (inline before initialize)"""
+        if self._executor is None:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+    
+    async def _process_audio_stream(self, audio_data: bytes, language: str, prompt: Optional[str] = None) -> str:
+        """Process in-memory audio and return transcript"""
+        return await self._run_cpu_bound(_transcribe_audio, audio_data, language, prompt)
     
     async def text_to_speech(self, text: str, language: str = "en", voice: Optional[str] = None) -> str:
         """Convert text to speech and return audio file URL"""
@@ -129,7 +314,7 @@ class SpeechProcessor:
             logger.info(f"Processing text-to-speech: {text[:50]}...")
             
             # Generate unique filename
-            audio_filename = f"tts_{uuid.uuid4().hex}.mp3"
+            audio_filename = f"tts_{self._file_prefix}_{next(self._file_counter)}.mp3"
             audio_path = os.path.join(self.audio_dir, audio_filename)
             
             # Generate speech audio
@@ -145,46 +330,25 @@ class SpeechProcessor:
             logger.error(f"Text-to-speech error: {e}")
             raise Exception(f"Speech synthesis failed: {str(e)}")
     
+    async def text_to_speech_bytes(self, text: str, language: str = "en", voice: Optional[str] = None) -> bytes:
+        """Convert text to speech and return the MP3 bytes without touching disk"""
+        try:
+            logger.info(f"Processing text-to-speech: {text[:50]}...")
+            return await self._run_cpu_bound(_synthesize_speech_bytes, text, language, voice)
+            
+        except Exception as e:
+            logger.error(f"Text-to-speech error: {e}")
+            raise Exception(f"Speech synthesis failed: {str(e)}")
+    
     async def _generate_speech_file(self, text: str, language: str, output_path: str, voice: Optional[str] = None):
         """Generate speech audio file"""
-        
-        # Mock implementation for demo
-        # In production, you'd use actual TTS:
-        
-        """
-        # Using gTTS (Google Text-to-Speech):
-        tts = gTTS(text=text, lang=language, slow=False)
-        tts.save(output_path)
-        
-        # Or using other TTS engines like:
-        # - Azure Cognitive Services Speech
-        # - AWS Polly
-        # - OpenAI TTS API
-        # - Local TTS models like Coqui TTS
-        """
-        
-        # For demo, create a placeholder file
-        with open(output_path, "wb") as f:
-            f.write(b"mock_audio_data")  # In real implementation, this would be actual audio
+        await self._run_cpu_bound(_synthesize_speech, text, language, output_path, voice)
     
-    async def get_supported_languages(self) -> Dict[str, str]:
+    def get_supported_languages(self) -> Mapping[str, str]:
         """Get list of supported languages for speech processing"""
-        return {
-            "en": "English",
-            "es": "Spanish",
-            "fr": "French",
-            "de": "German",
-            "it": "Italian",
-            "pt": "Portuguese",
-            "zh": "Chinese",
-            "ja": "Japanese",
-            "ko": "Korean",
-            "ru": "Russian",
-            "ar": "Arabic",
-            "hi": "Hindi"
-        }
+        return _SPEECH_LANGUAGES
     
-    async def get_supported_voices(self, language: str) -> Dict[str, str]:
+    def get_supported_voices(self, language: str) -> Dict[str, str]:
         """Get available voices for a specific language"""
         
         # Mock voice options
@@ -303,16 +467,19 @@ class SpeechProcessor:
     async def get_audio_stats(self) -> Dict[str, Any]:
         """Get statistics about audio processing"""
         
-        # Count files in audio directory
-        import glob
-        audio_files = glob.glob(os.path.join(self.audio_dir, "*.wav")) + \
-                     glob.glob(os.path.join(self.audio_dir, "*.mp3"))
-        
-        total_size = sum(os.path.getsize(f) for f in audio_files if os.path.exists(f))
+        # Count files in audio directory (DirEntry caches the stat result)
+        file_count = 0
+        total_size = 0
+        with os.scandir(self.audio_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith((".wav", ".mp3")) and entry.is_file():
+                    file_count += 1
+                    total_size += entry.stat().st_size
         
         return {
-            "temp_files": len(audio_files),
+            "temp_files": file_count,
             "total_size_bytes": total_size,
+            "transcript_cache_size": len(self.transcript_cache),
             "audio_directory": self.audio_dir,
             "supported_formats": ["wav", "mp3", "ogg", "flac"],
             "max_duration_seconds": 300,  # 5 minutes
@@ -322,24 +489,23 @@ class SpeechProcessor:
     async def cleanup_old_files(self, max_age_hours: int = 24):
         """Clean up old temporary audio files"""
         
-        import glob
         import time
         
         current_time = time.time()
         max_age_seconds = max_age_hours * 3600
         
-        audio_files = glob.glob(os.path.join(self.audio_dir, "*"))
         cleaned_count = 0
         
-        for file_path in audio_files:
-            try:
-                if os.path.isfile(file_path):
-                    file_age = current_time - os.path.getmtime(file_path)
-                    if file_age > max_age_seconds:
-                        os.remove(file_path)
-                        cleaned_count += 1
-            except Exception as e:
-                logger.warning(f"Could not clean up file {file_path}: {e}")
+        with os.scandir(self.audio_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        file_age = current_time - entry.stat().st_mtime
+                        if file_age > max_age_seconds:
+                            os.remove(entry.path)
+                            cleaned_count += 1
+                except Exception as e:
+                    logger.warning(f"Could not clean up file {entry.path}: {e}")
         
         logger.info(f"Cleaned up {cleaned_count} old audio files")
         return {"cleaned_files": cleaned_count}
\ No newline at end of file
@@ -1,7 +1,12 @@
+import re
+import sys
+import functools
 import logging
-from typing import Dict, Optional, Any
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Any, Tuple
 import asyncio
-import hashlib
+import httpx
 
 # For production, you'd use these imports:
 # from googletrans import Translator
@@ -10,39 +15,182 @@ import hashlib
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r'\b\w+\b')
+
+# Common function words used for keyword-based language detection
+_ES_KW = frozenset(map(sys.intern, ['mi', 'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'ser', 'se', 'no', 'te', 'lo', 'le', 'da', 'su', 'por', 'son', 'con', 'para', 'al', 'una', 'del', 'todo', 'está', 'muy', 'fue', 'han', 'era', 'sobre', 'entre', 'cuando', 'hasta', 'antes', 'después', 'porque', 'sin', 'contra', 'desde', 'durante', 'mediante', 'según', 'bajo', 'tras', 'hacia', 'donde', 'mientras', 'aunque', 'sino', 'menos', 'excepto', 'salvo', 'incluso', 'además', 'también', 'tampoco', 'así', 'entonces', 'aquí', 'ahí', 'allí', 'acá', 'allá']))
+_FR_KW = frozenset(map(sys.intern, ['le', 'de', 'et', 'à', 'un', 'il', 'être', 'et', 'en', 'avoir', 'que', 'pour', 'dans', 'ce', 'son', 'une', 'sur', 'avec', 'ne', 'se', 'pas', 'tout', 'plus', 'par', 'grand', 'comme', 'autre', 'mais', 'son', 'me', 'année', 'où', 'mon', 'lui', 'temps', 'très', 'chose', 'état', 'person', 'peu', 'jour', 'même', 'faire', 'aussi', 'deux', 'way', 'elle', 'bien', 'eau', 'sans', 'voir', 'depuis', 'pendant', 'contre', 'jusqu', 'avant', 'après', 'parce', 'chez', 'vers', 'sous', 'toujours', 'jamais', 'souvent', 'parfois', 'quelquefois', 'maintenant', 'hier', 'aujourd', 'demain']))
+
+_SUPPORTED_LANGUAGES = MappingProxyType({
+    'en': 'English',
+    'es': 'Spanish', 
+    'fr': 'French',
+    'de': 'German',
+    'it': 'Italian',
+    'pt': 'Portuguese',
+    'zh': 'Chinese',
+    'ja': 'Japanese',
+    'ko': 'Korean',
+    'ru': 'Russian',
+    'ar': 'Arabic',
+    'hi': 'Hindi'
+})
+
+# HR-specific translations for common terms
+_HR_TERMINOLOGY = MappingProxyType({
+    term: MappingProxyType(translations)
+    for term, translations in {
+        "employee": {
+            "es": "empleado",
+            "fr": "employé", 
+            "de": "Mitarbeiter",
+            "it": "dipendente",
+            "pt": "funcionário"
+        },
+        "manager": {
+            "es": "gerente",
+            "fr": "directeur",
+            "de": "Manager", 
+            "it": "manager",
+            "pt": "gerente"
+        },
+        "department": {
+            "es": "departamento",
+            "fr": "département",
+            "de": "Abteilung",
+            "it": "dipartimento", 
+            "pt": "departamento"
+        },
+        "attendance": {
+            "es": "asistencia",
+            "fr": "présence",
+            "de": "Anwesenheit",
+            "it": "presenza",
+            "pt": "presença"
+        },
+        "payroll": {
+            "es": "nómina",
+            "fr": "paie",
+            "de": "Lohnabrechnung",
+            "it": "busta paga",
+            "pt": "folha de pagamento"
+        },
+        "leave": {
+            "es": "permiso",
+            "fr": "congé", 
+            "de": "Urlaub",
+            "it": "permesso",
+            "pt": "licença"
+        },
+        "vacation": {
+            "es": "vacaciones",
+            "fr": "vacances",
+            "de": "Urlaub",
+            "it": "ferie",
+            "pt": "férias"
+        },
+        "sick leave": {
+            "es": "baja por enfermedad",
+            "fr": "congé maladie",
+            "de": "Krankenurlaub",
+            "it": "congedo per malattia",
+            "pt": "licença médica"
+        },
+        "performance": {
+            "es": "rendimiento",
+            "fr": "performance",
+            "de": "Leistung",
+            "it": "prestazione", 
+            "pt": "desempenho"
+        },
+        "salary": {
+            "es": "salario",
+            "fr": "salaire",
+            "de": "Gehalt",
+            "it": "stipendio",
+            "pt": "salário"
+        },
+        "overtime": {
+            "es": "horas extra",
+            "fr": "heures supplémentaires",
+            "de": "Überstunden",
+            "it": "straordinario",
+            "pt": "horas extras"
+        },
+        "benefits": {
+            "es": "beneficios",
+            "fr": "avantages",
+            "de": "Leistungen",
+            "it": "benefici",
+            "pt": "benefícios"
+        }
+    }.items()
+})
+
+
+def _match_case(source: str, replacement: str) -> str:
+    """Give replacement the casing style (upper, title or lower) of source"""
+    if source.isupper():
+        return replacement.upper()
+    if source.istitle():
+        return replacement.title()
+    return replacement.lower()
+
+
+_DETECT_CACHE_MAX_CHARS = 200
+
+
+@functools.lru_cache(maxsize=4096)
+def _detect_language_sync(text: str) -> str:
+    """Keyword-based language detection for demo"""
+    # Count the distinct words of the text that are common words of each language
+    tokens = set(_WORD_RE.findall(text.lower()))
+    
+    spanish_count = len(tokens & _ES_KW)
+    french_count = len(tokens & _FR_KW)
+    
+    if spanish_count > french_count and spanish_count > 0:
+        return "es"
+    elif french_count > 0:
+        return "fr"
+    else:
+        return "en"
+
+
+class TranslationError(Exception):
+    """Raised when the translation provider fails"""
+
+
 class TranslationService:
     """Multilingual translation service for HRMS commands and responses"""
     
     def __init__(self):
         self.translator = None
-        self.translation_cache = {}
-        self.supported_languages = {
-            'en': 'English',
-            'es': 'Spanish', 
-            'fr': 'French',
-            'de': 'German',
-            'it': 'Italian',
-            'pt': 'Portuguese',
-            'zh': 'Chinese',
-            'ja': 'Japanese',
-            'ko': 'Korean',
-            'ru': 'Russian',
-            'ar': 'Arabic',
-            'hi': 'Hindi'
-        }
+        self.http_client = None
+        self.translation_cache = OrderedDict()
+        self._cache_max = 10_000
+        self._cache_hits = 0
+        self._cache_misses = 0
+        # Caps concurrent calls to the translation provider
+        self._provider_semaphore = asyncio.Semaphore(20)
+        self.supported_languages = _SUPPORTED_LANGUAGES
         self.initialized = False
         
         # HR-specific translations for common terms
-        self.hr_terminology = self._load_hr_terminology()
+        self.hr_terminology = _HR_TERMINOLOGY
+        self._hr_replacers = {}
     
-    async def initialize(self):
+    async def initialize(self, http_client: Optional[httpx.AsyncClient] = None):
         """Initialize translation service"""
         try:
             logger.info("Initializing Translation Service...")
             
+            # Shared keep-alive connection pool for provider calls
+            self.http_client = http_client
+            
             # In production, initialize actual translation services:
             # self.translator = Translator()
-            # openai.api_key = os.getenv("OPENAI_API_KEY")
+            # self.openai = openai.AsyncOpenAI(http_client=self.http_client)
             # Load pre-trained translation models
             
             self.initialized = True
@@ -58,17 +206,28 @@ class TranslationService:
         self.initialized = False
         logger.info("Translation Service cleaned up")
     
-    async def health_check(self) -> bool:
+    def health_check(self) -> bool:
         """Check if translation service is healthy"""
         return self.initialized
     
-    async def translate(self, text: str, source_lang: str = "auto", target_lang: str = "en") -> str:
+    async def translate(self, text: str, source_lang: str = "auto", target_lang: str = "en", fallback: bool = True) -> str:
         """Translate text from source language to target language"""
         try:
+            # Nothing to translate in empty, numeric or punctuation-only text
+            if not any(ch.isalpha() for ch in text):
+                return text
+            
+            # Known source equal to target needs neither detection nor caching
+            if source_lang == target_lang:
+                return text
+            
             # Check cache first
             cache_key = self._generate_cache_key(text, source_lang, target_lang)
             if cache_key in self.translation_cache:
+                self._cache_hits += 1
+                self.translation_cache.move_to_end(cache_key)
                 return self.translation_cache[cache_key]
+            self._cache_misses += 1
             
             # Auto-detect language if needed
             if source_lang == "auto":
@@ -79,18 +238,24 @@ class TranslationService:
                 return text
             
             # Perform translation
-            translated_text = await self._perform_translation(text, source_lang, target_lang)
+            async with self._provider_semaphore:
+                translated_text = await self._perform_translation(text, source_lang, target_lang)
             
             # Apply HR-specific terminology corrections
             translated_text = self._apply_hr_terminology(translated_text, target_lang)
             
-            # Cache the result
+            # Cache the result, evicting the least recently used entry
+            if len(self.translation_cache) >= self._cache_max:
+                self.translation_cache.popitem(last=False)
             self.translation_cache[cache_key] = translated_text
             
             return translated_text
             
         except Exception as e:
             logger.error(f"Translation error: {e}")
+            # Callers that cache results need to know the provider failed
+            if not fallback:
+                raise TranslationError(str(e)) from e
             # Return original text as fallback
             return text
     
@@ -136,7 +301,7 @@ class TranslationService:
             tokenizer = MarianTokenizer.from_pretrained(model_name)
             
             inputs = tokenizer(text, return_tensors="pt", padding=True)
-            outputs = model.generate(**inputs)
+            outputs = model.generate(**inputs, use_cache=True)
             translated = tokenizer.decode(outputs[0], skip_special_tokens=True)
             return translated
         except Exception as e:
@@ -219,158 +384,68 @@ class TranslationService:
             return "en"
         """
         
-        # Simple keyword-based language detection for demo
-        spanish_keywords = ['mi', 'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'ser', 'se', 'no', 'te', 'lo', 'le', 'da', 'su', 'por', 'son', 'con', 'para', 'al', 'una', 'del', 'todo', 'está', 'muy', 'fue', 'han', 'era', 'sobre', 'entre', 'cuando', 'hasta', 'antes', 'después', 'porque', 'sin', 'contra', 'desde', 'durante', 'mediante', 'según', 'bajo', 'tras', 'hacia', 'donde', 'mientras', 'aunque', 'sino', 'menos', 'excepto', 'salvo', 'incluso', 'además', 'también', 'tampoco', 'así', 'entonces', 'aquí', 'ahí', 'allí', 'acá', 'allá']
-        french_keywords = ['le', 'de', 'et', 'à', 'un', 'il', 'être', 'et', 'en', 'avoir', 'que', 'pour', 'dans', 'ce', 'son', 'une', 'sur', 'avec', 'ne', 'se', 'pas', 'tout', 'plus', 'par', 'grand', 'comme', 'autre', 'mais', 'son', 'me', 'année', 'où', 'mon', 'lui', 'temps', 'très', 'chose', 'état', 'person', 'peu', 'jour', 'même', 'faire', 'aussi', 'deux', 'way', 'elle', 'bien', 'eau', 'sans', 'voir', 'depuis', 'pendant', 'contre', 'jusqu', 'avant', 'après', 'parce', 'chez', 'vers', 'sous', 'toujours', 'jamais', 'souvent', 'parfois', 'quelquefois', 'maintenant', 'hier', 'aujourd', 'demain']
-        
-        text_lower = text.lower()
-        
-        spanish_count = sum(1 for word in spanish_keywords if word in text_lower)
-        french_count = sum(1 for word in french_keywords if word in text_lower)
-        
-        if spanish_count > french_count and spanish_count > 0:
-            return "es"
-        elif french_count > 0:
-            return "fr"
-        else:
-            return "en"
+        # Short commands repeat a lot; long texts are unique and would only
+        # evict useful entries from the memo
+        if len(text) > _DETECT_CACHE_MAX_CHARS:
+            return _detect_language_sync.__wrapped__(text)
+        return _detect_language_sync(text)
     
-    def _generate_cache_key(self, text: str, source_lang: str, target_lang: str) -> str:
+    def _generate_cache_key(self, text: str, source_lang: str, target_lang: str) -> Tuple[str, str, str]:
         """Generate cache key for translation"""
-        combined = f"{text}_{source_lang}_{target_lang}"
-        return hashlib.md5(combined.encode()).hexdigest()
+        return (text, source_lang, target_lang)
     
     def _apply_hr_terminology(self, text: str, target_lang: str) -> str:
         """Apply HR-specific terminology corrections"""
         
-        if target_lang not in self.hr_terminology:
+        pattern, replacements = self._get_hr_replacer(target_lang)
+        if pattern is None:
             return text
         
-        # Replace HR terms with proper translations
-        for english_term, translations in self.hr_terminology.items():
-            if target_lang in translations:
-                # Case-insensitive replacement
-                text = text.replace(english_term.lower(), translations[target_lang].lower())
-                text = text.replace(english_term.title(), translations[target_lang].title())
-                text = text.replace(english_term.upper(), translations[target_lang].upper())
-        
-        return text
+        # Replace all HR terms with proper translations in a single pass
+        return pattern.sub(
+            lambda match: _match_case(match.group(0), replacements[match.group(0).lower()]),
+            text
+        )
     
-    def _load_hr_terminology(self) -> Dict[str, Dict[str, str]]:
-        """Load HR-specific terminology translations"""
-        return {
-            "employee": {
-                "es": "empleado",
-                "fr": "employé", 
-                "de": "Mitarbeiter",
-                "it": "dipendente",
-                "pt": "funcionário"
-            },
-            "manager": {
-                "es": "gerente",
-                "fr": "directeur",
-                "de": "Manager", 
-                "it": "manager",
-                "pt": "gerente"
-            },
-            "department": {
-                "es": "departamento",
-                "fr": "département",
-                "de": "Abteilung",
-                "it": "dipartimento", 
-                "pt": "departamento"
-            },
-            "attendance": {
-                "es": "asistencia",
-                "fr": "présence",
-                "de": "Anwesenheit",
-                "it": "presenza",
-                "pt": "presença"
-            },
-            "payroll": {
-                "es": "nómina",
-                "fr": "paie",
-                "de": "Lohnabrechnung",
-                "it": "busta paga",
-                "pt": "folha de pagamento"
-            },
-            "leave": {
-                "es": "permiso",
-                "fr": "congé", 
-                "de": "Urlaub",
-                "it": "permesso",
-                "pt": "licença"
-            },
-            "vacation": {
-                "es": "vacaciones",
-                "fr": "vacances",
-                "de": "Urlaub",
-                "it": "ferie",
-                "pt": "férias"
-            },
-            "sick leave": {
-                "es": "baja por enfermedad",
-                "fr": "congé maladie",
-                "de": "Krankenurlaub",
-                "it": "congedo per malattia",
-                "pt": "licença médica"
-            },
-            "performance": {
-                "es": "rendimiento",
-                "fr": "performance",
-                "de": "Leistung",
-                "it": "prestazione", 
-                "pt": "desempenho"
-            },
-            "salary": {
-                "es": "salario",
-                "fr": "salaire",
-                "de": "Gehalt",
-                "it": "stipendio",
-                "pt": "salário"
-            },
-            "overtime": {
-                "es": "horas extra",
-                "fr": "heures supplémentaires",
-                "de": "Überstunden",
-                "it": "straordinario",
-                "pt": "horas extras"
-            },
-            "benefits": {
-                "es": "beneficios",
-                "fr": "avantages",
-                "de": "Leistungen",
-                "it": "benefici",
-                "pt": "benefícios"
+    def _get_hr_replacer(self, target_lang: str) -> Tuple[Optional[re.Pattern], Dict[str, str]]:
+        """Build (once per language) a case-insensitive regex matching every HR term"""
+        replacer = self._hr_replacers.get(target_lang)
+        if replacer is None:
+            replacements = {
+                english_term.lower(): translations[target_lang]
+                for english_term, translations in self.hr_terminology.items()
+                if target_lang in translations
             }
-        }
+            
+            # Longest terms first so "sick leave" wins over "leave"
+            terms = sorted(replacements, key=len, reverse=True)
+            pattern = None
+            if terms:
+                pattern = re.compile(r'\b(' + '|'.join(map(re.escape, terms)) + r')\b', re.IGNORECASE)
+            replacer = (pattern, replacements)
+            self._hr_replacers[target_lang] = replacer
+        return replacer
     
-    async def get_supported_languages(self) -> Dict[str, str]:
-        """Get list of supported languages"""
-        return self.supported_languages.copy()
+    def get_supported_languages(self) -> Mapping[str, str]:
+        """Get a read-only view of the supported languages"""
+        return self.supported_languages
     
     async def batch_translate(self, texts: list, source_lang: str, target_lang: str) -> list:
         """Translate multiple texts at once"""
-        results = []
         
-        # Process in batches to avoid rate limits
-        batch_size = 10
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            batch_results = []
-            
-            for text in batch:
-                try:
-                    translated = await self.translate(text, source_lang, target_lang)
-                    batch_results.append(translated)
-                except Exception as e:
-                    logger.error(f"Batch translation error for '{text}': {e}")
-                    batch_results.append(text)  # Fallback to original
-            
-            results.extend(batch_results)
-            
-            # Small delay to avoid rate limiting
-            await asyncio.sleep(0.1)
+        # Translate concurrently; the provider semaphore in translate() rate limits
+        translated = await asyncio.gather(
+            *(self.translate(text, source_lang, target_lang) for text in texts),
+            return_exceptions=True
+        )
+        
+        results = []
+        for text, result in zip(texts, translated):
+            if isinstance(result, Exception):
+                logger.error(f"Batch translation error for '{text}': {result}")
+                results.append(text)  # Fallback to original
+            else:
+                results.append(result)
         
         return results
     
@@ -398,10 +473,15 @@ class TranslationService:
             "original_text": text
         }
     
-    async def get_translation_stats(self) -> Dict[str, Any]:
+    def get_translation_stats(self) -> Dict[str, Any]:
         """Get translation service statistics"""
+        lookups = self._cache_hits + self._cache_misses
         return {
             "cache_size": len(self.translation_cache),
+            "cache_max_size": self._cache_max,
+            "cache_hits": self._cache_hits,
+            "cache_misses": self._cache_misses,
+            "hit_rate": self._cache_hits / lookups if lookups else 0.0,
             "supported_languages": len(self.supported_languages),
             "hr_terms": len(self.hr_terminology),
             "most_common_pairs": [
@@ -420,10 +500,10 @@ class TranslationService:
         logger.info(f"Cleared translation cache ({cache_size} entries)")
         return {"cleared_entries": cache_size}
     
-    async def validate_language_code(self, lang_code: str) -> bool:
+    def validate_language_code(self, lang_code: str) -> bool:
         """Validate if language code is supported"""
         return lang_code in self.supported_languages
     
-    async def get_language_name(self, lang_code: str) -> str:
+    def get_language_name(self, lang_code: str) -> str:
         """Get full language name from code"""
         return self.supported_languages.get(lang_code, "Unknown")
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import List
 from pydantic_settings import BaseSettings
 
@@ -9,6 +10,8 @@ class Settings(BaseSettings):
     debug: bool = False
     log_level: str = "info"
     port: int = 8000
+    web_concurrency: int = 1  # uvicorn worker processes (WEB_CONCURRENCY)
+    cors_origins: List[str] = ["*"]
     
     # API Keys
     openai_api_key: str = ""
@@ -24,12 +27,18 @@ class Settings(BaseSettings):
     redis_url: str = "redis://localhost:6379"
     cache_enabled: bool = True
     cache_ttl: int = 3600
+    # /nlp/command responses that don't depend on the caller can be shared
+    response_cache_ttl: int = 300
+    response_cache_actions: List[str] = [
+        "view_employees", "search_employees", "generate_report", "unknown"
+    ]
     
     # File handling
     temp_dir: str = "/tmp/robohr_ai"
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     audio_format: str = "wav"
     max_audio_duration: int = 300  # 5 minutes
+    speech_workers: int = 2  # speech worker processes per web worker, each with its own model
     
     # Model configuration
     nlp_model: str = "distilbert-base-uncased"
@@ -49,4 +58,9 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = False
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Application settings, read from the environment once"""
+    return Settings()
+
+settings = get_settings()
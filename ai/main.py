@@ -1,96 +1,252 @@
 from fastapi import FastAPI, HTTPException, Request, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 import uvicorn
-import os
-from datetime import datetime
+import httpx
+import orjson
+import asyncio
+import hashlib
+import inspect
+import time
+from contextlib import asynccontextmanager
 import logging
+import logging.handlers
+import queue
+from typing import Dict, Optional, Tuple
 
 # Import our modules
 from commands.nlp import CommandProcessor
 from commands.speech import SpeechProcessor
-from commands.translation import TranslationService
+from commands.translation import TranslationError, TranslationService
+from commands.cache import CommandResponseCache, TranslationCache
+from config.settings import get_settings
 from models.schemas import (
     CommandRequest, CommandResponse, 
     SpeechToTextRequest, SpeechToTextResponse,
     TextToSpeechRequest, TextToSpeechResponse,
-    HealthResponse
+    TranslationRequest, TranslationResponse,
+    HealthResponse, iso_now
 )
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+settings = get_settings()
+
+# Configure logging: handlers only enqueue records, a background thread
+# (started in lifespan) writes them
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+root_logger = logging.getLogger()
+root_logger.setLevel(getattr(logging, settings.log_level.upper(), logging.INFO))
 logger = logging.getLogger(__name__)
 
+# Last (time.time(), ISO timestamp) pair handed out by _now_iso
+_last_now = [0.0, ""]
+
+def _now_iso() -> str:
+    """Current time in ISO format, recomputed at most once per second"""
+    t = time.time()
+    if t - _last_now[0] >= 1.0:
+        _last_now[0] = t
+        _last_now[1] = iso_now(t)
+    return _last_now[1]
+
+# Initialize services
+command_processor = CommandProcessor()
+speech_processor = SpeechProcessor(max_workers=settings.speech_workers)
+translation_service = TranslationService()
+translation_cache = TranslationCache(settings.redis_url if settings.cache_enabled else None)
+response_cache = CommandResponseCache(
+    settings.redis_url if settings.cache_enabled else None,
+    ttl=settings.response_cache_ttl
+)
+
+# Actions whose response is the same for every employee
+_CACHEABLE_ACTIONS = frozenset(settings.response_cache_actions)
+
+# Request languages that go through English for command processing
+_NON_EN = frozenset(translation_service.supported_languages) - {'en'}
+
+# Translations currently being computed, so identical concurrent requests
+# share one provider call
+_inflight: Dict[Tuple[str, str, str], asyncio.Task] = {}
+
+async def _translate_and_cache(text: str, source_lang: str, target_lang: str) -> str:
+    """Call the provider and store a successful result in the shared cache"""
+    translated = await translation_service.translate(text, source_lang, target_lang, fallback=False)
+    await translation_cache.set(text, source_lang, target_lang, translated)
+    return translated
+
+def _finish_inflight(key: Tuple[str, str, str], task: asyncio.Task):
+    """Forget a finished shared translation"""
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        task.exception()  # Callers get the error; don't log it as unretrieved
+
+async def cached_translate(text: str, source_lang: str, target_lang: str) -> str:
+    """Translate through the shared two-tier (memory + Redis) cache; provider failures raise TranslationError"""
+    translated = await translation_cache.get(text, source_lang, target_lang)
+    if translated is not None:
+        return translated
+    
+    key = (text, source_lang, target_lang)
+    task = _inflight.get(key)
+    if task is None:
+        # The call runs as its own task, so it finishes whichever callers go away
+        task = asyncio.ensure_future(_translate_and_cache(text, source_lang, target_lang))
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _finish_inflight(key, done))
+    return await asyncio.shield(task)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize services on startup and clean them up on shutdown"""
+    log_queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    log_listener = logging.handlers.QueueListener(log_queue, _log_stream, respect_handler_level=True)
+    root_logger.addHandler(queue_handler)
+    log_listener.start()
+    
+    logger.info("🤖 Starting ROBOHR AI Service...")
+    
+    # One keep-alive (HTTP/2) connection pool shared by all outbound calls
+    app.state.http = httpx.AsyncClient(
+        timeout=10.0,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        http2=True
+    )
+    await asyncio.gather(
+        command_processor.initialize(http_client=app.state.http),
+        speech_processor.initialize(http_client=app.state.http),
+        translation_service.initialize(http_client=app.state.http),
+        translation_cache.connect(),
+        response_cache.connect()
+    )
+    logger.info("✅ AI Service initialized successfully")
+    
+    yield
+    
+    logger.info("🔄 Shutting down AI Service...")
+    await asyncio.gather(
+        command_processor.cleanup(),
+        speech_processor.cleanup(),
+        translation_service.cleanup(),
+        translation_cache.close(),
+        response_cache.close()
+    )
+    await app.state.http.aclose()
+    logger.info("✅ AI Service shutdown complete")
+    
+    # Flush queued records before the process exits
+    root_logger.removeHandler(queue_handler)
+    log_listener.stop()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="ROBOHR AI Service",
     description="AI-powered Natural Language Processing for HRMS",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
+    allow_origins=settings.cors_origins,  # In production, specify exact origins
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
-# Initialize services
-command_processor = CommandProcessor()
-speech_processor = SpeechProcessor()
-translation_service = TranslationService()
+# Static response bodies, serialized once at import time. The root payload is
+# split around its only dynamic field, the timestamp.
+_ROOT_HEAD = orjson.dumps({
+    "service": "ROBOHR AI Service",
+    "version": "1.0.0",
+    "status": "running"
+})[:-1] + b',"timestamp":'
+_ROOT_TAIL = b',"endpoints":' + orjson.dumps({
+    "health": "/health",
+    "nlp_command": "/nlp/command",
+    "speech_to_text": "/speech-to-text",
+    "text_to_speech": "/text-to-speech",
+    "translate": "/translate"
+}) + b'}'
 
-@app.on_startup
-async def startup_event():
-    """Initialize services on startup"""
-    logger.info("🤖 Starting ROBOHR AI Service...")
-    await command_processor.initialize()
-    await speech_processor.initialize()
-    await translation_service.initialize()
-    logger.info("✅ AI Service initialized successfully")
+_CAPABILITIES_BYTES = orjson.dumps({
+    "supported_languages": ("en", "es", "fr", "de", "it", "pt", "zh", "ja"),
+    "commands": (
+        "view_attendance", "clock_in", "clock_out", "request_leave",
+        "view_payroll", "view_employees", "get_employee_info",
+        "create_employee", "update_employee", "generate_report"
+    ),
+    "speech_formats": ("wav", "mp3", "ogg"),
+    "features": (
+        "natural_language_processing",
+        "speech_recognition",
+        "text_to_speech",
+        "multilingual_support",
+        "command_execution",
+        "intent_recognition"
+    )
+})
 
-@app.on_shutdown
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    logger.info("🔄 Shutting down AI Service...")
-    await command_processor.cleanup()
-    await speech_processor.cleanup()
-    await translation_service.cleanup()
-    logger.info("✅ AI Service shutdown complete")
+# Root bodies differ only by timestamp, so its validator is weak
+_ROOT_ETAG = 'W/"%s"' % hashlib.md5(_ROOT_HEAD + _ROOT_TAIL, usedforsecurity=False).hexdigest()
+_CAPABILITIES_ETAG = '"%s"' % hashlib.md5(_CAPABILITIES_BYTES, usedforsecurity=False).hexdigest()
+_STATIC_CACHE_CONTROL = "public, max-age=300"
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match covers etag (weak comparison)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
 
-@app.get("/", response_model=dict)
-async def root():
+@app.get("/")
+async def root(request: Request):
     """Root endpoint with service information"""
-    return {
-        "service": "ROBOHR AI Service",
-        "version": "1.0.0",
-        "status": "running",
-        "timestamp": datetime.now().isoformat(),
-        "endpoints": {
-            "health": "/health",
-            "nlp_command": "/nlp/command",
-            "speech_to_text": "/speech-to-text",
-            "text_to_speech": "/text-to-speech",
-            "translate": "/translate"
-        }
-    }
+    headers = {"ETag": _ROOT_ETAG, "Cache-Control": _STATIC_CACHE_CONTROL}
+    if etag_matches(request, _ROOT_ETAG):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=_ROOT_HEAD + orjson.dumps(_now_iso()) + _ROOT_TAIL,
+        media_type="application/json",
+        headers=headers
+    )
+
+async def run_health_check(check) -> bool:
+    """Run a service health check, whether it is sync or async"""
+    result = check()
+    if inspect.isawaitable(result):
+        result = await result
+    return bool(result)
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
     try:
-        # Check if all services are healthy
-        nlp_status = await command_processor.health_check()
-        speech_status = await speech_processor.health_check()
-        translation_status = await translation_service.health_check()
+        # Check all services concurrently; a failing check counts as unhealthy
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                run_health_check(command_processor.health_check),
+                run_health_check(speech_processor.health_check),
+                run_health_check(translation_service.health_check),
+                return_exceptions=True
+            ),
+            timeout=settings.health_check_timeout
+        )
+        nlp_status, speech_status, translation_status = (result is True for result in results)
         
         all_healthy = all([nlp_status, speech_status, translation_status])
         
-        return HealthResponse(
+        return HealthResponse.model_construct(
             status="healthy" if all_healthy else "degraded",
-            timestamp=datetime.now().isoformat(),
+            timestamp=_now_iso(),
             services={
                 "nlp": "healthy" if nlp_status else "unhealthy",
                 "speech": "healthy" if speech_status else "unhealthy",
@@ -98,21 +254,33 @@ async def health_check():
             }
         )
     except Exception as e:
-        logger.error(f"Health check failed: {e}")
+        logger.error("Health check failed: %s", e)
         raise HTTPException(status_code=503, detail="Service unhealthy")
 
 @app.post("/nlp/command", response_model=CommandResponse)
 async def process_command(request: CommandRequest):
     """Process natural language commands"""
     try:
-        logger.info(f"Processing command: {request.text[:50]}...")
+        logger.info("Processing command: %.50s...", request.text)
+        
+        # Employee-independent commands may already have a shared response
+        cached = await response_cache.get(request.lang, request.text)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+        
+        # Languages the classifier understands skip both translation round trips
+        native = request.lang in command_processor.native_languages
+        needs_translation = not native and request.lang in _NON_EN
         
-        # Translate to English if needed
+        # Translate to English if needed; on provider failure fall back to the
+        # original text but keep the response out of the shared cache
+        cacheable = True
         processed_text = request.text
-        if request.lang != 'en':
-            processed_text = await translation_service.translate_to_english(
-                request.text, request.lang
-            )
+        if needs_translation:
+            try:
+                processed_text = await cached_translate(request.text, request.lang, 'en')
+            except TranslationError:
+                cacheable = False
         
         # Process the command
         result = await command_processor.process_command(
@@ -121,63 +289,90 @@ async def process_command(request: CommandRequest):
             request.employee_id
         )
         
-        # Translate response back if needed
-        if request.lang != 'en' and result.get('message'):
-            result['message'] = await translation_service.translate_from_english(
-                result['message'], request.lang
-            )
+        # Translate the response back if needed
+        message = result.get('message', '')
+        if needs_translation and message:
+            try:
+                message = await cached_translate(message, 'en', request.lang)
+            except TranslationError:
+                cacheable = False
         
-        return CommandResponse(
+        response = CommandResponse.model_construct(
             success=True,
             action=result.get('action', 'unknown'),
             parameters=result.get('parameters', {}),
-            message=result.get('message', ''),
+            message=message,
             confidence=result.get('confidence', 0.5),
             original_text=request.text,
             processed_text=processed_text,
             language=request.lang
         )
+        if cacheable and response.action in _CACHEABLE_ACTIONS:
+            await response_cache.set(request.lang, request.text, response.model_dump_json())
+        
+        return response
         
     except Exception as e:
-        logger.error(f"Command processing error: {e}")
+        logger.error("Command processing error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+async def read_upload(upload: UploadFile, max_size: int) -> bytes:
+    """Read an upload, failing with 413 once it exceeds max_size"""
+    if upload.size is not None and upload.size > max_size:
+        raise HTTPException(status_code=413, detail="Audio file too large")
+    
+    # One bounded read: at most max_size + 1 bytes are ever held in memory
+    data = await upload.read(max_size + 1)
+    if len(data) > max_size:
+        raise HTTPException(status_code=413, detail="Audio file too large")
+    return data
+
 @app.post("/speech-to-text", response_model=SpeechToTextResponse)
 async def speech_to_text(
     audio_file: UploadFile = File(...),
-    language: str = "en"
+    language: str = "en",
+    session_id: Optional[str] = None
 ):
     """Convert speech to text"""
     try:
-        logger.info(f"Processing speech-to-text for language: {language}")
+        logger.info("Processing speech-to-text for language: %s", language)
         
-        # Read audio file
-        audio_data = await audio_file.read()
+        # Read the whole audio file (the recognizer needs all of it), rejecting
+        # oversized uploads without buffering more than the size limit
+        audio_data = await read_upload(audio_file, settings.max_file_size)
         
         # Process speech
-        transcript = await speech_processor.speech_to_text(audio_data, language)
+        transcript = await speech_processor.speech_to_text(audio_data, language, session_id)
         
-        return SpeechToTextResponse(
+        return SpeechToTextResponse.model_construct(
             success=True,
             transcript=transcript,
             language=language,
             confidence=0.9  # This would come from the actual speech recognition
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Speech-to-text error: {e}")
+        logger.error("Speech-to-text error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/text-to-speech", response_model=TextToSpeechResponse)
-async def text_to_speech(request: TextToSpeechRequest):
+async def text_to_speech(request: TextToSpeechRequest, http_request: Request, stream: bool = False):
     """Convert text to speech"""
     try:
-        logger.info(f"Processing text-to-speech: {request.text[:50]}...")
+        logger.info("Processing text-to-speech: %.50s...", request.text)
+        
+        # Send the audio itself when asked, sparing the client a second fetch.
+        # Synthesis finishes before any headers go out, so failures still map to 500
+        if stream or http_request.headers.get("accept", "").startswith("audio/"):
+            audio = await speech_processor.text_to_speech_bytes(request.text, request.lang, request.voice)
+            return Response(content=audio, media_type="audio/mpeg")
         
         # Generate speech
         audio_url = await speech_processor.text_to_speech(request.text, request.lang)
         
-        return TextToSpeechResponse(
+        return TextToSpeechResponse.model_construct(
             success=True,
             audio_url=audio_url,
             text=request.text,
@@ -185,67 +380,55 @@ async def text_to_speech(request: TextToSpeechRequest):
         )
         
     except Exception as e:
-        logger.error(f"Text-to-speech error: {e}")
+        logger.error("Text-to-speech error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/translate")
-async def translate_text(request: dict):
+@app.post("/translate", response_model=TranslationResponse)
+async def translate_text(request: TranslationRequest):
     """Translate text between languages"""
     try:
-        text = request.get('text')
-        source_lang = request.get('source_lang', 'auto')
-        target_lang = request.get('target_lang', 'en')
-        
-        if not text:
+        if not request.text:
             raise HTTPException(status_code=400, detail="Text is required")
         
-        translated_text = await translation_service.translate(
-            text, source_lang, target_lang
-        )
+        try:
+            translated_text = await cached_translate(
+                request.text, request.source_lang, request.target_lang
+            )
+        except TranslationError:
+            translated_text = request.text
         
-        return {
-            "success": True,
-            "original_text": text,
-            "translated_text": translated_text,
-            "source_language": source_lang,
-            "target_language": target_lang
-        }
+        return TranslationResponse.model_construct(
+            success=True,
+            original_text=request.text,
+            translated_text=translated_text,
+            source_language=request.source_lang,
+            target_language=request.target_lang
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Translation error: {e}")
+        logger.error("Translation error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/capabilities")
-async def get_capabilities():
+async def get_capabilities(request: Request):
     """Get AI service capabilities"""
-    return {
-        "supported_languages": ["en", "es", "fr", "de", "it", "pt", "zh", "ja"],
-        "commands": [
-            "view_attendance", "clock_in", "clock_out", "request_leave",
-            "view_payroll", "view_employees", "get_employee_info",
-            "create_employee", "update_employee", "generate_report"
-        ],
-        "speech_formats": ["wav", "mp3", "ogg"],
-        "features": [
-            "natural_language_processing",
-            "speech_recognition",
-            "text_to_speech",
-            "multilingual_support",
-            "command_execution",
-            "intent_recognition"
-        ]
-    }
+    headers = {"ETag": _CAPABILITIES_ETAG, "Cache-Control": _STATIC_CACHE_CONTROL}
+    if etag_matches(request, _CAPABILITIES_ETAG):
+        return Response(status_code=304, headers=headers)
+    return Response(content=_CAPABILITIES_BYTES, media_type="application/json", headers=headers)
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler"""
-    logger.error(f"Unhandled exception: {exc}")
+    logger.error("Unhandled exception: %s", exc)
     return JSONResponse(
         status_code=500,
         content={
             "success": False,
             "error": "Internal server error",
-            "detail": str(exc) if os.getenv("DEBUG") else "Something went wrong"
+            "detail": str(exc) if settings.debug else "Something went wrong"
         }
     )
 
@@ -253,7 +436,10 @@ if __name__ == "__main__":
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
-        port=int(os.getenv("PORT", 8000)),
-        reload=os.getenv("DEBUG", "false").lower() == "true",
-        log_level="info"
+        port=settings.port,
+        reload=settings.debug,
+        workers=settings.web_concurrency,
+        loop="uvloop",
+        http="httptools",
+        log_level=settings.log_level.lower()
     )
\ No newline at end of file
@@ -1,25 +1,32 @@
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
+import time
 from datetime import datetime
 
+def iso_now(t: Optional[float] = None) -> str:
+    """ISO 8601 UTC timestamp ("Z" suffix) for t, defaulting to now"""
+    if t is None:
+        t = time.time()
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(t)) + f".{int(t % 1 * 1e6):06d}Z"
+
 class CommandRequest(BaseModel):
     """Request model for NLP command processing"""
     text: str = Field(..., description="The command text to process")
     lang: str = Field(default="en", description="Language code (en, es, fr, etc.)")
     employee_id: Optional[int] = Field(None, description="Employee ID for context")
-    context: Optional[Dict[str, Any]] = Field(default={}, description="Additional context")
+    context: Optional[Dict[str, Any]] = Field(default_factory=dict, description="Additional context")
 
 class CommandResponse(BaseModel):
     """Response model for processed commands"""
     success: bool = Field(..., description="Whether the command was processed successfully")
     action: str = Field(..., description="The identified action/intent")
-    parameters: Dict[str, Any] = Field(default={}, description="Extracted parameters")
+    parameters: Dict[str, Any] = Field(default_factory=dict, description="Extracted parameters")
     message: str = Field(default="", description="Human-readable response message")
     confidence: float = Field(default=0.0, description="Confidence score (0-1)")
     original_text: str = Field(..., description="Original input text")
     processed_text: str = Field(..., description="Processed/translated text")
     language: str = Field(..., description="Language of the input")
-    suggestions: Optional[List[str]] = Field(default=[], description="Alternative suggestions")
+    suggestions: Optional[List[str]] = Field(default_factory=list, description="Alternative suggestions")
 
 class SpeechToTextRequest(BaseModel):
     """Request model for speech-to-text conversion"""
@@ -34,7 +41,7 @@ class SpeechToTextResponse(BaseModel):
     language: str = Field(..., description="Detected/specified language")
     confidence: float = Field(default=0.0, description="Recognition confidence")
     duration: Optional[float] = Field(None, description="Audio duration in seconds")
-    alternatives: Optional[List[str]] = Field(default=[], description="Alternative transcriptions")
+    alternatives: Optional[List[str]] = Field(default_factory=list, description="Alternative transcriptions")
 
 class TextToSpeechRequest(BaseModel):
     """Request model for text-to-speech conversion"""
@@ -57,7 +64,7 @@ class TranslationRequest(BaseModel):
     """Request model for text translation"""
     text: str = Field(..., description="Text to translate")
     source_lang: str = Field(default="auto", description="Source language (auto-detect)")
-    target_lang: str = Field(..., description="Target language")
+    target_lang: str = Field(default="en", description="Target language")
 
 class TranslationResponse(BaseModel):
     """Response model for text translation"""
@@ -80,8 +87,8 @@ class IntentClassification(BaseModel):
     """Model for intent classification results"""
     intent: str = Field(..., description="Classified intent")
     confidence: float = Field(..., description="Classification confidence")
-    entities: Dict[str, Any] = Field(default={}, description="Extracted entities")
-    context: Dict[str, Any] = Field(default={}, description="Context information")
+    entities: Dict[str, Any] = Field(default_factory=dict, description="Extracted entities")
+    context: Dict[str, Any] = Field(default_factory=dict, description="Context information")
 
 class EntityExtraction(BaseModel):
     """Model for entity extraction results"""
@@ -95,7 +102,7 @@ class LanguageDetection(BaseModel):
     """Model for language detection results"""
     language: str = Field(..., description="Detected language code")
     confidence: float = Field(..., description="Detection confidence")
-    alternatives: List[Dict[str, float]] = Field(default=[], description="Alternative languages")
+    alternatives: List[Dict[str, float]] = Field(default_factory=list, description="Alternative languages")
 
 class CommandHistory(BaseModel):
     """Model for command execution history"""
@@ -123,7 +130,7 @@ class ErrorResponse(BaseModel):
     error: str = Field(..., description="Error type")
     message: str = Field(..., description="Error message")
     details: Optional[Dict[str, Any]] = Field(None, description="Additional error details")
-    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
+    timestamp: str = Field(default_factory=iso_now)
     request_id: Optional[str] = Field(None, description="Request ID for tracking")
 
 # Configuration models
@@ -139,7 +146,7 @@ class SpeechConfig(BaseModel):
     sample_rate: int = Field(default=16000, description="Audio sample rate")
     chunk_size: int = Field(default=1024, description="Audio chunk size")
     max_duration: int = Field(default=30, description="Maximum audio duration in seconds")
-    formats: List[str] = Field(default=["wav", "mp3"], description="Supported formats")
+    formats: List[str] = Field(default_factory=lambda: ["wav", "mp3"], description="Supported formats")
 
 class TranslationConfig(BaseModel):
     """Configuration for translation service"""
@@ -147,6 +154,6 @@ class TranslationConfig(BaseModel):
     cache_enabled: bool = Field(default=True, description="Enable translation caching")
     max_length: int = Field(default=5000, description="Maximum text length")
     supported_languages: List[str] = Field(
-        default=["en", "es", "fr", "de", "it", "pt", "zh", "ja"],
+        default_factory=lambda: ["en", "es", "fr", "de", "it", "pt", "zh", "ja"],
         description="Supported language codes"
     )
\ No newline at end of file
@@ -0,0 +1,33 @@
+import pytest
+from commands.cache import CommandResponseCache, TranslationCache
+
+@pytest.mark.asyncio
+async def test_translation_cache_without_redis():
+    cache = TranslationCache(redis_url=None, max_size=2)
+    await cache.connect()
+    
+    assert await cache.get("clock in", "en", "es") is None
+    await cache.set("clock in", "en", "es", "fichar entrada")
+    assert await cache.get("clock in", "en", "es") == "fichar entrada"
+    
+    # Least recently used entry is evicted
+    await cache.set("clock out", "en", "es", "fichar salida")
+    await cache.set("payroll", "en", "es", "nómina")
+    assert await cache.get("clock in", "en", "es") is None
+    
+    stats = cache.get_stats()
+    assert stats["local_size"] == 2
+    assert stats["redis_connected"] == False
+    
+    await cache.close()
+
+@pytest.mark.asyncio
+async def test_command_response_cache_expires():
+    cache = CommandResponseCache(redis_url=None, ttl=0)
+    await cache.connect()
+    
+    await cache.set("en", "show employees", '{"action": "view_employees"}')
+    assert await cache.get("en", "show employees") is None
+    assert cache.get_stats()["local_size"] == 0
+    
+    await cache.close()
@@ -0,0 +1,122 @@
+import asyncio
+import io
+import logging
+import logging.handlers
+import pytest
+import main
+from commands.translation import TranslationError
+
+@pytest.mark.asyncio
+async def test_cached_translate_shares_errors(monkeypatch):
+    release = asyncio.Event()
+    calls = []
+    
+    async def failing_translate(text, source_lang, target_lang, fallback=True):
+        calls.append(text)
+        await release.wait()
+        raise RuntimeError("provider down")
+    
+    monkeypatch.setattr(main.translation_service, "translate", failing_translate)
+    
+    tasks = [asyncio.create_task(main.cached_translate("shared error", "en", "es")) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert not main._inflight
+
+@pytest.mark.asyncio
+async def test_cached_translate_survives_waiter_cancellation(monkeypatch):
+    release = asyncio.Event()
+    
+    async def slow_translate(text, source_lang, target_lang, fallback=True):
+        await release.wait()
+        return "traducido"
+    
+    monkeypatch.setattr(main.translation_service, "translate", slow_translate)
+    
+    leader = asyncio.create_task(main.cached_translate("cancelled waiter", "en", "es"))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(main.cached_translate("cancelled waiter", "en", "es")) for _ in range(2)]
+    await asyncio.sleep(0)
+    
+    waiters[0].cancel()
+    await asyncio.sleep(0)
+    release.set()
+    
+    assert await leader == "traducido"
+    assert await waiters[1] == "traducido"
+    assert waiters[0].cancelled()
+    assert not main._inflight
+
+def test_lifespan_can_run_twice():
+    from fastapi.testclient import TestClient
+    
+    for _ in range(2):
+        with TestClient(main.app) as client:
+            assert client.get("/health").status_code == 200
+    
+    assert not any(isinstance(h, logging.handlers.QueueHandler) for h in logging.getLogger().handlers)
+
+@pytest.mark.asyncio
+async def test_failed_translation_is_not_cached(monkeypatch):
+    async def failing_translate(text, source_lang, target_lang, fallback=True):
+        raise TranslationError("provider down")
+    
+    monkeypatch.setattr(main.translation_service, "translate", failing_translate)
+    
+    with pytest.raises(TranslationError):
+        await main.cached_translate("provider outage", "es", "en")
+    assert await main.translation_cache.get("provider outage", "es", "en") is None
+    
+    response = await main.process_command(main.CommandRequest(text="mostrar empleados sin red", lang="es"))
+    assert response.processed_text == "mostrar empleados sin red"
+    assert await main.response_cache.get("es", "mostrar empleados sin red") is None
+
+@pytest.mark.asyncio
+async def test_read_upload_enforces_size_limit():
+    from fastapi import HTTPException, UploadFile
+    
+    assert await main.read_upload(UploadFile(io.BytesIO(b"x" * 10)), max_size=10) == b"x" * 10
+    
+    with pytest.raises(HTTPException) as exc:
+        await main.read_upload(UploadFile(io.BytesIO(b"x" * 11)), max_size=10)
+    assert exc.value.status_code == 413
+
+def test_text_to_speech_audio_failure_is_500(monkeypatch):
+    from fastapi.testclient import TestClient
+    
+    async def failing_synthesis(text, language="en", voice=None):
+        raise Exception("Speech synthesis failed")
+    
+    monkeypatch.setattr(main.speech_processor, "text_to_speech_bytes", failing_synthesis)
+    
+    with TestClient(main.app) as client:
+        response = client.post("/text-to-speech?stream=true", json={"text": "hello", "lang": "en"})
+    assert response.status_code == 500
+
+@pytest.mark.asyncio
+async def test_cached_translate_survives_leader_cancellation(monkeypatch):
+    release = asyncio.Event()
+    
+    async def slow_translate(text, source_lang, target_lang, fallback=True):
+        await release.wait()
+        return "traducido"
+    
+    monkeypatch.setattr(main.translation_service, "translate", slow_translate)
+    
+    leader = asyncio.create_task(main.cached_translate("cancelled leader", "en", "es"))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(main.cached_translate("cancelled leader", "en", "es"))
+    await asyncio.sleep(0)
+    
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    
+    assert await waiter == "traducido"
+    assert leader.cancelled()
+    assert await main.translation_cache.get("cancelled leader", "en", "es") == "traducido"
+    assert not main._inflight
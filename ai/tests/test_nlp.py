@@ -31,3 +31,81 @@ async def test_clock_in_command():
     assert result["parameters"]["employee_id"] == 1
     
     await processor.cleanup()
+
+@pytest.mark.asyncio
+async def test_command_cache_is_bounded():
+    processor = CommandProcessor()
+    await processor.initialize()
+    processor._cache_max = 2
+    
+    await processor.process_command("clock in", "en", 1)
+    await processor.process_command("clock out", "en", 1)
+    await processor.process_command("show my attendance", "en", 1)
+    
+    assert len(processor.command_cache) == 2
+    
+    await processor.cleanup()
+
+@pytest.mark.asyncio
+async def test_leave_request_extracts_days():
+    processor = CommandProcessor()
+    await processor.initialize()
+    
+    result = await processor.process_command("request leave for 3 days with my manager", "en", 1)
+    
+    assert result["action"] == "request_leave"
+    assert result["parameters"]["days"] == 3
+    
+    await processor.cleanup()
+
+@pytest.mark.asyncio
+async def test_employee_name_keeps_original_casing():
+    processor = CommandProcessor()
+    await processor.initialize()
+    
+    result = await processor.process_command("find employee John Doe", "en", 1)
+    
+    assert result["action"] == "search_employees"
+    assert result["parameters"]["name"] == "John Doe"
+    
+    await processor.cleanup()
+
+@pytest.mark.asyncio
+async def test_capitalised_command_is_not_a_name():
+    processor = CommandProcessor()
+    await processor.initialize()
+    
+    result = await processor.process_command("Show My Attendance", "en", 1)
+    assert result["parameters"]["employee_name"] is None
+    
+    result = await processor.process_command("Show Attendance For Jane Smith", "en", 1)
+    assert result["parameters"]["employee_name"] == "Jane Smith"
+    
+    await processor.cleanup()
+
+@pytest.mark.asyncio
+async def test_process_batch():
+    processor = CommandProcessor()
+    await processor.initialize()
+    
+    # "clock" + "in" must not be joined into a clock-in across commands
+    results = await processor.process_batch(["show my attendance", "clock", "in", "clock out"], "en", 1)
+    
+    assert [r["action"] for r in results] == ["view_attendance", "unknown", "unknown", "clock_out"]
+    
+    await processor.cleanup()
+
+@pytest.mark.asyncio
+async def test_process_batch_uses_intent_classifier():
+    processor = CommandProcessor()
+    await processor.initialize()
+    processor.intent_classifier = lambda text: [{"label": "payroll", "score": 0.8}]
+    
+    single = await processor.process_command("show my attendance", "en", 1)
+    results = await processor.process_batch(["show my attendance", "clock in"], "en", 2)
+    
+    assert single["action"] == "view_payroll"
+    assert [r["action"] for r in results] == ["view_payroll", "view_payroll"]
+    assert results[0]["confidence"] == 0.8
+    
+    await processor.cleanup()
@@ -1,5 +1,5 @@
 import pytest
-from commands.translation import TranslationService
+from commands.translation import TranslationError, TranslationService
 
 @pytest.mark.asyncio
 async def test_translation_service_initialization():
@@ -32,3 +32,41 @@ async def test_translation():
     assert "asistencia" in result.lower()
     
     await service.cleanup()
+
+@pytest.mark.asyncio
+async def test_hr_terminology_preserves_case():
+    service = TranslationService()
+    await service.initialize()
+    
+    result = service._apply_hr_terminology("Request SICK LEAVE for eMployee in Payroll", "es")
+    assert result == "Request BAJA POR ENFERMEDAD for empleado in Nómina"
+    
+    await service.cleanup()
+
+@pytest.mark.asyncio
+async def test_translate_skips_text_without_letters():
+    service = TranslationService()
+    await service.initialize()
+    
+    for text in ["", "   ", "42", "?!"]:
+        assert await service.translate(text, "auto", "es") == text
+    assert len(service.translation_cache) == 0
+    
+    await service.cleanup()
+
+@pytest.mark.asyncio
+async def test_translate_provider_failure(monkeypatch):
+    service = TranslationService()
+    await service.initialize()
+    
+    async def failing_provider(text, source_lang, target_lang):
+        raise RuntimeError("provider down")
+    
+    monkeypatch.setattr(service, "_perform_translation", failing_provider)
+    
+    assert await service.translate("clock in", "en", "es") == "clock in"
+    with pytest.raises(TranslationError):
+        await service.translate("clock in", "en", "es", fallback=False)
+    assert len(service.translation_cache) == 0
+    
+    await service.cleanup()